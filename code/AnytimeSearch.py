@@ -0,0 +1,83 @@
+import time
+from RushHourSearch import a_star_search, null_heuristic
+
+# the heuristic weights of the successive weighted A* runs
+DEFAULT_WEIGHTS = (5, 3, 2, 1.5, 1.25, 1)
+# the default time budget of anytime_a_star, in seconds
+DEFAULT_TIME_BUDGET = 1.0
+
+
+class BudgetExhausted(Exception):
+    pass
+
+
+class SearchBudget:
+    """
+    A wall clock and/or expanded nodes budget for a search. check raises
+    BudgetExhausted once the deadline passed or the search expanded max_expanded
+    nodes.
+    """
+
+    def __init__(self, time_budget=None, max_expanded=None):
+        self.deadline = time.perf_counter() + time_budget if time_budget is not None else None
+        self.max_expanded = max_expanded
+
+    def check(self, stats):
+        if self.max_expanded is not None and stats.expanded >= self.max_expanded:
+            raise BudgetExhausted()
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            raise BudgetExhausted()
+
+
+def anytime_a_star(problem, heuristic=null_heuristic, time_budget=DEFAULT_TIME_BUDGET, max_expanded=None,
+                   weights=DEFAULT_WEIGHTS, on_solution=None):
+    """
+    Anytime weighted A*: runs a_star_search with decreasing heuristic weights,
+    each run pruned by the cost of the best solution so far, until the runs are
+    over or the time/expanded nodes budget runs out, and returns the best
+    solution found. If the budget runs out before the first solution, the first
+    (most greedy) run is completed without a budget, so a solvable card always
+    gets a solution.
+
+    A completed run with weight w finds a solution at most w times longer than the
+    optimal one. Only a completed run with weight 1 proves the best solution
+    optimal when it finds nothing better: the weighted runs close nodes with
+    costs that may be too high and never reopen them, so together with the
+    pruning by the best cost they may miss a cheaper solution. The proven bound
+    on best cost / optimal cost is stored in problem.suboptimality_bound (None if
+    no solution was found). The bound only holds for admissible and consistent
+    heuristics.
+    :param on_solution: if given, called with (solution, bound) on every
+    improvement.
+    """
+    budget = SearchBudget(time_budget, max_expanded)
+    best = None
+    lower_bound = heuristic(problem.get_start_state(), problem)
+    problem.suboptimality_bound = None
+    exhausted = False
+    for weight in weights:
+        try:
+            solution = a_star_search(problem, heuristic, weight=weight,
+                                     cost_bound=len(best) if best is not None else None, budget=budget)
+        except BudgetExhausted:
+            if best is not None:
+                break
+            # no answer yet: restart the most greedy run and finish it whatever it costs
+            weight = weights[0]
+            solution = a_star_search(problem, heuristic, weight=weight)
+            exhausted = True
+        if solution or problem.is_goal_state(problem.get_start_state()):
+            best = solution
+            lower_bound = max(lower_bound, len(best) / weight)
+        elif best is None:
+            # no solution at all
+            break
+        elif weight <= 1:
+            # an exhaustive run found nothing cheaper than the best solution
+            lower_bound = len(best)
+        problem.suboptimality_bound = len(best) / lower_bound if lower_bound > 0 else 1.0
+        if on_solution is not None:
+            on_solution(best, problem.suboptimality_bound)
+        if exhausted or problem.suboptimality_bound <= 1:
+            break
+    return best if best is not None else []
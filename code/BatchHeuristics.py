@@ -0,0 +1,167 @@
+import numpy as np
+from RushHourSearch import null_heuristic, distance_heuristic, power_distance_heuristic, blocking_heuristic, \
+    blocked_blocking_heuristic, blocking_and_distance_heuristic, blocked_and_distance_heuristic, \
+    manhattan_heuristic, board_division_heuristic, get_weight_table, calculate_manhattan_distance_helper, \
+    board_division_helper
+
+"""
+Vectorized heuristics: evaluate a heuristic on a whole batch of states of the
+same card with a few NumPy operations instead of one Python call per state.
+A batch is given as encoded states: an array of keys (an object array of Python
+integers if they may not fit in 64 bits), an array of occupancy masks and an
+array of player vehicle offsets (see Bitboard).
+"""
+
+
+def get_numpy_tables(bitboard):
+    """
+    :return: a dictionary of the NumPy tables of a card, computed once and cached
+    in the bitboard: the cell shifts, the exit row cells of every player offset
+    (as a 0/1 matrix) and the distance of every player offset
+    """
+    tables = bitboard.tables.get('numpy')
+    if tables is None:
+        cells = bitboard.board_w * bitboard.board_h
+        if cells > 64:
+            raise ValueError("batch heuristics support boards of up to 64 cells")
+        shifts = np.arange(cells, dtype=np.uint64)
+        exit_masks = np.array(bitboard.exit_masks, dtype=np.uint64)
+        last_index = bitboard.board_w - bitboard.sizes[bitboard.player]
+        tables = {'shifts': shifts,
+                  'exit_cells': ((exit_masks[:, None] >> shifts) & np.uint64(1)).astype(np.int64),
+                  'distances': np.maximum(last_index - np.arange(len(exit_masks)), 0)}
+        bitboard.tables['numpy'] = tables
+    return tables
+
+
+def get_numpy_weight_table(bitboard, weight_function):
+    """
+    :return: the weight table of get_weight_table as a NumPy matrix
+    """
+    key = ('numpy', weight_function)
+    table = bitboard.tables.get(key)
+    if table is None:
+        table = np.array(get_weight_table(bitboard, weight_function), dtype=np.float64)
+        bitboard.tables[key] = table
+    return table
+
+
+def get_cells(bitboard, occupancies):
+    """
+    :return: a (states x cells) 0/1 matrix of the occupied cells of every state
+    """
+    shifts = get_numpy_tables(bitboard)['shifts']
+    return ((occupancies[:, None] >> shifts) & np.uint64(1)).astype(np.int64)
+
+
+def null_batch(bitboard, keys, occupancies, player_offsets):
+    return np.zeros(len(occupancies), dtype=np.int64)
+
+
+def distance_batch(bitboard, keys, occupancies, player_offsets):
+    return get_numpy_tables(bitboard)['distances'][player_offsets]
+
+
+def power_distance_batch(bitboard, keys, occupancies, player_offsets):
+    return distance_batch(bitboard, keys, occupancies, player_offsets) ** 10
+
+
+def blocking_batch(bitboard, keys, occupancies, player_offsets):
+    exit_cells = get_numpy_tables(bitboard)['exit_cells'][player_offsets]
+    return (get_cells(bitboard, occupancies) * exit_cells).sum(axis=1)
+
+
+def get_blocked_tables(bitboard):
+    """
+    :return: the NumPy tables of blocked_blocking_batch, computed once and cached in
+    the bitboard: for every vehicle that can stand in the exit row (except the
+    player vehicle), its index, its backward and forward target masks by offset,
+    and the number of exit row cells it blocks by (offset, player offset)
+    """
+    tables = bitboard.tables.get('numpy_blocked')
+    if tables is None:
+        tables = []
+        for i in range(bitboard.num_of_vehicles):
+            blocks = [[bin(cell_mask & exit_mask).count("1") for exit_mask in bitboard.exit_masks]
+                      for cell_mask in bitboard.cell_masks[i]]
+            if i == bitboard.player or not any(map(any, blocks)):
+                continue
+            tables.append((i, np.array(bitboard.backward_masks[i], dtype=np.uint64),
+                           np.array(bitboard.forward_masks[i], dtype=np.uint64), np.array(blocks, dtype=np.int64)))
+        bitboard.tables['numpy_blocked'] = tables
+    return tables
+
+
+def blocked_blocking_batch(bitboard, keys, occupancies, player_offsets):
+    """
+    Every exit row cell in front of the player vehicle counts 1, and 2 if the
+    vehicle in it can't move either way (see blocked_blocking_heuristic).
+    """
+    zero = np.uint64(0)
+    # the scalars of an object array are Python integers
+    number = int if keys.dtype == object else np.uint64
+    offset_mask = number(bitboard.offset_mask)
+    values = np.zeros(len(occupancies), dtype=np.int64)
+    for i, backward_masks, forward_masks, blocks in get_blocked_tables(bitboard):
+        offsets = ((keys >> number(bitboard.shifts[i])) & offset_mask).astype(np.intp)
+        backward = backward_masks[offsets]
+        forward = forward_masks[offsets]
+        blocked = ((backward == zero) | ((occupancies & backward) != zero)) & \
+            ((forward == zero) | ((occupancies & forward) != zero))
+        values += blocks[offsets, player_offsets] * (1 + blocked)
+    return values
+
+
+def blocking_and_distance_batch(bitboard, keys, occupancies, player_offsets):
+    return blocking_batch(bitboard, keys, occupancies, player_offsets) + \
+        distance_batch(bitboard, keys, occupancies, player_offsets)
+
+
+def blocked_and_distance_batch(bitboard, keys, occupancies, player_offsets):
+    return blocked_blocking_batch(bitboard, keys, occupancies, player_offsets) + \
+        distance_batch(bitboard, keys, occupancies, player_offsets)
+
+
+def weight_batch(weight_function):
+    """
+    :return: the batch version of weight_heuristic for the given weight function
+    """
+    def batch(bitboard, keys, occupancies, player_offsets):
+        weights = get_numpy_weight_table(bitboard, weight_function)[player_offsets]
+        return (get_cells(bitboard, occupancies) * weights).sum(axis=1)
+    return batch
+
+
+BATCH_HEURISTICS = {
+    null_heuristic: null_batch,
+    distance_heuristic: distance_batch,
+    power_distance_heuristic: power_distance_batch,
+    blocking_heuristic: blocking_batch,
+    blocked_blocking_heuristic: blocked_blocking_batch,
+    blocking_and_distance_heuristic: blocking_and_distance_batch,
+    blocked_and_distance_heuristic: blocked_and_distance_batch,
+    manhattan_heuristic: weight_batch(calculate_manhattan_distance_helper),
+    board_division_heuristic: weight_batch(board_division_helper)}
+
+
+def evaluate_batch(heuristic, states, problem=None):
+    """
+    Evaluate a heuristic on a list of states of the same card, with a single
+    vectorized call if the heuristic has a batch version in BATCH_HEURISTICS, and
+    state by state otherwise (or if the occupancy masks of the card don't fit in
+    64 bits).
+    :return: a list of the heuristic values
+    """
+    batch = BATCH_HEURISTICS.get(heuristic)
+    if batch is None or not states or states[0].bitboard.wide_occupancy:
+        return [heuristic(state, problem) for state in states]
+    bitboard = states[0].bitboard
+    if bitboard.wide_keys:
+        keys = np.array([state.key for state in states], dtype=object)
+        player_offsets = ((keys >> bitboard.shifts[bitboard.player]) & bitboard.offset_mask).astype(np.int64)
+    else:
+        keys = np.fromiter((state.key for state in states), dtype=np.uint64, count=len(states))
+        player_offsets = ((keys >> np.uint64(bitboard.shifts[bitboard.player])) &
+                          np.uint64(bitboard.offset_mask)).astype(np.int64)
+    occupancies = np.fromiter((state.occupancy for state in states), dtype=np.uint64, count=len(states))
+    return batch(bitboard, keys, occupancies, player_offsets).tolist()
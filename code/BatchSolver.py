@@ -0,0 +1,190 @@
+import argparse
+import csv
+import glob
+import json
+import os
+import signal
+import sys
+import time
+from multiprocessing import Pool
+from RushHourSearch import RushHourSearch, MemoizedHeuristic
+from Game import ALGORITHM, HEURISTICS, HEURISTIC_NAMES, ALGORITHM_NAMES as GAME_ALGORITHM_NAMES
+from CardCorpus import read_cards
+from LayeredBFS import layered_bfs
+from ExternalSearch import external_bfs
+
+ALGORITHM_NAMES = dict(GAME_ALGORITHM_NAMES, lbfs=layered_bfs, ebfs=external_bfs)
+RESULT_FIELDS = ["card", "algorithm", "heuristic", "status", "expanded", "generated", "time", "solution_length",
+                 "duplicates", "peak_open", "peak_closed", "move_generation_time", "heuristic_time", "queue_time",
+                 "memo_hits", "memo_misses", "error"]
+
+
+def get_algorithm(name):
+    """
+    :return: the search algorithm of a name of ALGORITHM_NAMES or a key of ALGORITHM
+    """
+    if name in ALGORITHM:
+        return ALGORITHM[name]
+    return ALGORITHM_NAMES[name]
+
+
+def get_heuristic(name):
+    """
+    :return: the heuristic of a name of HEURISTIC_NAMES or a key of HEURISTICS
+    """
+    if name in HEURISTICS:
+        return HEURISTICS[name]
+    return HEURISTIC_NAMES[name]
+
+
+def get_card_paths(patterns):
+    """
+    :param patterns: card files, directories of card files or glob patterns
+    :return: the sorted list of card files
+    """
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, "*")
+        paths += [path for path in glob.glob(pattern) if os.path.isfile(path) and not path.endswith(".zip")]
+    return sorted(set(paths))
+
+
+class SolveTimeout(Exception):
+    pass
+
+
+def raise_timeout(signum, frame):
+    raise SolveTimeout()
+
+
+def solve_task(task):
+    """
+    Solve a single card in a worker process.
+    :param task: a tuple of (card name, vehicles list, algorithm name, heuristic
+    name, timeout in seconds or None, heuristic memo capacity or None); the
+    vehicles list is the exception of a card that couldn't be parsed
+    :return: a result row, a dictionary with the RESULT_FIELDS keys; a card that
+    can't be solved because of an exception (e.g. a malformed card) gets an
+    "error" status and the exception in the error field
+    """
+    name, vehicles_list, algorithm_name, heuristic_name, timeout, memo_size = task
+    row = {"card": name, "algorithm": algorithm_name, "heuristic": heuristic_name}
+    rushHour = None
+    heuristic = get_heuristic(heuristic_name)
+    if memo_size:
+        heuristic = MemoizedHeuristic(heuristic, memo_size)
+    start = time.time()
+    try:
+        if timeout:
+            signal.signal(signal.SIGALRM, raise_timeout)
+            signal.setitimer(signal.ITIMER_REAL, timeout)
+        if isinstance(vehicles_list, Exception):
+            raise vehicles_list
+        rushHour = RushHourSearch(vehicles_list)
+        backtrace = get_algorithm(algorithm_name)(rushHour, heuristic)
+        if backtrace or rushHour.is_goal_state(rushHour.get_start_state()):
+            row["status"] = "solved"
+        else:
+            row["status"] = "unsolvable" if rushHour.is_unsolvable() else "unsolved"
+        row["solution_length"] = len(backtrace)
+    except SolveTimeout:
+        row["status"] = "timeout"
+        row["solution_length"] = None
+    except Exception as e:
+        row["status"] = "error"
+        row["solution_length"] = None
+        row["error"] = repr(e)
+    finally:
+        if timeout:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    row["time"] = time.time() - start
+    if rushHour is not None:
+        stats = rushHour.stats.as_dict()
+        for field in RESULT_FIELDS[4:]:
+            if field in stats:
+                row[field] = stats[field]
+    if memo_size:
+        row["memo_hits"] = heuristic.hits
+        row["memo_misses"] = heuristic.misses
+    return row
+
+
+def solve_batch(cards, combinations, processes=None, timeout=None, memo_size=None):
+    """
+    Solve every card with every (algorithm name, heuristic name) combination on a
+    pool of worker processes.
+    :param cards: an iterable of (name, vehicles list) tuples, e.g.
+    read_cards(patterns, keep_errors=True), consumed lazily
+    :param memo_size: if given, the heuristics are wrapped with a MemoizedHeuristic
+    of this capacity
+    :return: a generator of the result rows, in the order they finish
+    """
+    tasks = ((name, vehicles_list, algorithm_name, heuristic_name, timeout, memo_size)
+             for name, vehicles_list in cards for algorithm_name, heuristic_name in combinations)
+    with Pool(processes) as pool:
+        for row in pool.imap_unordered(solve_task, tasks):
+            yield row
+
+
+class ResultWriter:
+    """
+    Writes result rows to a file as csv or json lines, flushing every row.
+    """
+
+    def __init__(self, file, output_format):
+        self.file = file
+        self.output_format = output_format
+        if output_format == "csv":
+            self.writer = csv.DictWriter(file, RESULT_FIELDS)
+            self.writer.writeheader()
+
+    def write(self, row):
+        if self.output_format == "csv":
+            self.writer.writerow(row)
+        else:
+            self.file.write(json.dumps(row) + "\n")
+        self.file.flush()
+
+
+def parse_combination(combination):
+    """
+    parse an "algorithm:heuristic" command line argument
+    """
+    algorithm_name, _, heuristic_name = combination.partition(":")
+    get_algorithm(algorithm_name)
+    get_heuristic(heuristic_name or "null")
+    return algorithm_name, heuristic_name or "null"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve a corpus of Rush Hour cards on all the cores.")
+    parser.add_argument("cards", nargs="+",
+                        help="card files, directories of cards, zip archives, binary corpora or glob patterns")
+    parser.add_argument("-c", "--combination", action="append", dest="combinations",
+                        help="algorithm:heuristic to run, e.g. astar:blocking (repeatable, default astar:blocking). "
+                             "algorithms: " + ", ".join(ALGORITHM_NAMES) + "; heuristics: " + ", ".join(HEURISTIC_NAMES))
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="number of worker processes (default: all cores)")
+    parser.add_argument("-t", "--timeout", type=float, default=None, help="time limit of a single solve in seconds")
+    parser.add_argument("-m", "--memo", type=int, default=None,
+                        help="memoize the heuristic values of up to this many states per solve")
+    parser.add_argument("-f", "--format", choices=["csv", "jsonl"], default="csv")
+    parser.add_argument("-o", "--output", default=None, help="output file (default: standard output)")
+    args = parser.parse_args(argv)
+    try:
+        combinations = [parse_combination(combination) for combination in args.combinations or ["astar:blocking"]]
+    except KeyError as e:
+        parser.error("unknown algorithm or heuristic " + str(e))
+    output = open(args.output, "w", newline="") if args.output else sys.stdout
+    try:
+        writer = ResultWriter(output, args.format)
+        cards = read_cards(args.cards, keep_errors=True)
+        for row in solve_batch(cards, combinations, args.jobs, args.timeout, args.memo):
+            writer.write(row)
+    finally:
+        if args.output:
+            output.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,272 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import signal
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+import numpy as np
+from BatchSolver import ALGORITHM_NAMES, HEURISTIC_NAMES, SolveTimeout, raise_timeout, get_card_paths
+from Game import parse_file
+from RushHourSearch import RushHourSearch
+
+SEED = 0
+DEFAULT_THRESHOLD = 0.1
+# the module a command line solve imports, and its import time budget in seconds
+STARTUP_MODULE = "Game"
+IMPORT_TIME_BUDGET = 0.1
+# modules that are slow to import and should only be imported when needed
+HEAVY_MODULES = ["numpy", "sqlite3", "multiprocessing"]
+
+
+def run_once(path, algorithm, heuristic, timeout=None):
+    """
+    Solve a card once.
+    :return: a tuple of (wall time, problem, solution length), the solution
+    length is None if the run timed out
+    """
+    rushHour = RushHourSearch(parse_file(path))
+    start = time.perf_counter()
+    try:
+        if timeout:
+            signal.signal(signal.SIGALRM, raise_timeout)
+            signal.setitimer(signal.ITIMER_REAL, timeout)
+        solution_length = len(algorithm(rushHour, heuristic))
+    except SolveTimeout:
+        solution_length = None
+    finally:
+        if timeout:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    return time.perf_counter() - start, rushHour, solution_length
+
+
+def benchmark(path, algorithm_name, heuristic_name, warmup=1, repeats=3, timeout=None):
+    """
+    Benchmark an algorithm and heuristic on a card. The warmup runs are traced
+    with tracemalloc to measure the peak memory, the timed runs are not.
+    :return: a dictionary of the results; a run that raises (e.g. a malformed
+    card, or an algorithm that fails with this heuristic) gives an "error" status
+    with the exception, so the other combinations are still benchmarked
+    """
+    algorithm = ALGORITHM_NAMES[algorithm_name]
+    heuristic = HEURISTIC_NAMES[heuristic_name]
+    random.seed(SEED)
+    np.random.seed(SEED)
+    peak_memory = 0
+    for _ in range(max(warmup, 1)):
+        tracemalloc.start()
+        try:
+            _, rushHour, solution_length = run_once(path, algorithm, heuristic, timeout)
+        except Exception as e:
+            return {"status": "error", "error": repr(e), "peak_memory": peak_memory}
+        finally:
+            peak_memory = max(peak_memory, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        if solution_length is None:
+            return {"status": "timeout", "peak_memory": peak_memory}
+    times = []
+    for _ in range(repeats):
+        random.seed(SEED)
+        np.random.seed(SEED)
+        try:
+            wall_time, rushHour, solution_length = run_once(path, algorithm, heuristic, timeout)
+        except Exception as e:
+            return {"status": "error", "error": repr(e), "peak_memory": peak_memory}
+        if solution_length is None:
+            return {"status": "timeout", "peak_memory": peak_memory}
+        times.append(wall_time)
+    median = statistics.median(times)
+    return {"status": "solved" if solution_length or rushHour.is_goal_state(rushHour.get_start_state()) else "unsolved",
+            "time": median,
+            "min_time": min(times),
+            "expanded": rushHour.expanded,
+            "generated": rushHour.generated,
+            "nodes_per_second": rushHour.expanded / median if median > 0 else None,
+            "solution_length": solution_length,
+            "peak_memory": peak_memory,
+            "duplicates": rushHour.stats.duplicates,
+            "peak_open": rushHour.stats.peak_open,
+            "peak_closed": rushHour.stats.peak_closed,
+            "move_generation_time": rushHour.stats.move_generation_time,
+            "heuristic_time": rushHour.stats.heuristic_time,
+            "queue_time": rushHour.stats.queue_time}
+
+
+def get_peak_rss():
+    """
+    :return: the peak resident set size of the process in bytes
+    """
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on linux and in bytes on mac
+    return peak_rss if sys.platform == "darwin" else peak_rss * 1024
+
+
+def benchmark_and_measure_rss(args):
+    """
+    Run benchmark with the given arguments and add the peak resident set size of
+    the process to its result as peak_rss.
+    """
+    result = benchmark(*args)
+    result["peak_rss"] = get_peak_rss()
+    return result
+
+
+def benchmark_in_process(path, algorithm_name, heuristic_name, warmup=1, repeats=3, timeout=None):
+    """
+    Benchmark an algorithm and heuristic on a card (see benchmark) in a fresh
+    interpreter, so the peak resident set size of the result (peak_rss) only
+    measures this combination.
+    """
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        return pool.apply(benchmark_and_measure_rss,
+                          ((path, algorithm_name, heuristic_name, warmup, repeats, timeout),))
+
+
+def measure_startup(module=STARTUP_MODULE, repeats=5):
+    """
+    Import a module in fresh interpreters, with -X importtime.
+    :return: a dictionary of the median import time of the module, the median
+    wall time of the whole interpreter run (its startup included) and the heavy
+    modules (HEAVY_MODULES) it imported
+    """
+    import_times = []
+    startup_times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, "-X", "importtime", "-c", "import " + module], capture_output=True,
+                                text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stderr
+        startup_times.append(time.perf_counter() - start)
+        # every line is "import time: self [us] | cumulative | imported package", the module comes last
+        lines = [line.split("|") for line in output.splitlines() if line.startswith("import time:")]
+        import_times.append(int(lines[-1][1]) / 1e6)
+        imported = {line[2].strip() for line in lines}
+    return {"module": module,
+            "import_time": statistics.median(import_times),
+            "startup_time": statistics.median(startup_times),
+            "heavy_modules": [name for name in HEAVY_MODULES if name in imported]}
+
+
+def check_startup(current, baseline=None, budget=IMPORT_TIME_BUDGET):
+    """
+    :return: a list of regression messages: the import time of the startup module
+    is over the budget, or it imports heavy modules that it didn't import in the
+    baseline
+    """
+    regressions = []
+    startup = current["startup"]
+    if startup["import_time"] > budget:
+        regressions.append("import %s: import_time %.6g over the budget of %.6g" % (startup["module"],
+                                                                                    startup["import_time"], budget))
+    if baseline is not None and "startup" in baseline:
+        for name in startup["heavy_modules"]:
+            if name not in baseline["startup"]["heavy_modules"]:
+                regressions.append("import %s: now imports %s" % (startup["module"], name))
+    return regressions
+
+
+def run_benchmarks(card_paths, algorithm_names, heuristic_names, warmup=1, repeats=3, timeout=None, verbose=True):
+    """
+    Benchmark every combination of card, algorithm and heuristic, each in its own
+    process (see benchmark_in_process).
+    :return: a baseline dictionary with the run metadata and the results keyed by
+    "card/algorithm/heuristic"
+    """
+    results = {}
+    for path in card_paths:
+        for algorithm_name in algorithm_names:
+            for heuristic_name in heuristic_names:
+                name = "/".join([os.path.basename(path), algorithm_name, heuristic_name])
+                results[name] = benchmark_in_process(path, algorithm_name, heuristic_name, warmup, repeats, timeout)
+                if verbose:
+                    print(name + ": " + json.dumps(results[name]), file=sys.stderr)
+    return {"meta": {"python": platform.python_version(),
+                     "platform": platform.platform(),
+                     "seed": SEED,
+                     "warmup": warmup,
+                     "repeats": repeats,
+                     "timeout": timeout},
+            "startup": measure_startup(),
+            "results": results}
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare benchmark results against a baseline.
+    :return: a list of regression messages, one for every time, expanded nodes
+    or memory measurement that grew by more than the threshold (a fraction), and
+    every run that no longer solves its card in time or now fails
+    """
+    regressions = []
+    for name, result in sorted(current["results"].items()):
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        if base["status"] != "timeout" and result["status"] == "timeout":
+            regressions.append(name + ": timed out")
+            continue
+        if base["status"] != "error" and result["status"] == "error":
+            regressions.append(name + ": failed with " + result["error"])
+            continue
+        for field in ("time", "expanded", "peak_memory", "peak_rss"):
+            if base.get(field) and result.get(field) is not None and result[field] > base[field] * (1 + threshold):
+                regressions.append("%s: %s %.6g -> %.6g (%+.1f%%)" % (name, field, base[field], result[field],
+                                                                       100 * (result[field] / base[field] - 1)))
+    return regressions
+
+
+def positive_int(value):
+    """
+    parse a command line argument of at least 1
+    """
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError("expected a number of at least 1, got %r" % value)
+    return number
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the search algorithms and heuristics on the cards.")
+    parser.add_argument("cards", nargs="*", default=["cards"], help="card files, directories or glob patterns")
+    parser.add_argument("-a", "--algorithm", action="append", dest="algorithms", choices=list(ALGORITHM_NAMES),
+                        help="algorithm to benchmark (repeatable, default: all)")
+    parser.add_argument("-H", "--heuristic", action="append", dest="heuristics", choices=list(HEURISTIC_NAMES),
+                        help="heuristic to benchmark (repeatable, default: all)")
+    parser.add_argument("-w", "--warmup", type=int, default=1)
+    parser.add_argument("-r", "--repeats", type=positive_int, default=3)
+    parser.add_argument("-t", "--timeout", type=float, default=30, help="time limit of a single run in seconds")
+    parser.add_argument("-o", "--output", default=None, help="save the results as a json baseline file")
+    parser.add_argument("-c", "--compare", default=None, help="a baseline file to compare the results against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="relative growth that counts as a regression (default 0.1)")
+    parser.add_argument("--import-budget", type=float, default=IMPORT_TIME_BUDGET,
+                        help="import time budget of " + STARTUP_MODULE + " in seconds (default %g)" % IMPORT_TIME_BUDGET)
+    args = parser.parse_args(argv)
+    current = run_benchmarks(get_card_paths(args.cards), args.algorithms or list(ALGORITHM_NAMES),
+                             args.heuristics or list(HEURISTIC_NAMES), args.warmup, args.repeats, args.timeout)
+    print("startup: " + json.dumps(current["startup"]), file=sys.stderr)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(current, file, indent=2, sort_keys=True)
+    baseline = None
+    regressions = []
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        regressions = compare(baseline, current, args.threshold)
+    regressions += check_startup(current, baseline, args.import_budget)
+    for regression in regressions:
+        print("REGRESSION " + regression)
+    if regressions:
+        sys.exit(1)
+    if args.compare:
+        print("no regressions")
+
+
+if __name__ == '__main__':
+    main()
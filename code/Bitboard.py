@@ -0,0 +1,207 @@
+class Bitboard:
+    """
+    Static bitboard tables of a card, computed once from its vehicles list and shared
+    by every board of that card.
+
+    A cell (x, y) is represented by bit y * board_w + x of an integer occupancy mask.
+    Every vehicle moves along a single axis, so its position is fully described by its
+    offset along that axis (x for horizontal vehicles, y for vertical ones).
+
+    The Bitboard stores, for the i'th vehicle of the vehicles list:
+    - ids/directions/sizes: the static vehicle metadata.
+    - lanes: the fixed coordinate of the vehicle (y for horizontal vehicles, x for
+      vertical ones).
+    - shifts: the bit position of the vehicle offset in a packed state key, where
+      every offset takes offset_bits bits (OFFSET_BITS on boards of up to 8x8, more
+      on larger boards).
+    - cell_masks[i][offset]: the cells the vehicle occupies at the given offset.
+    - forward_masks[i][offset]: the cell the vehicle enters when moving +1 from the
+      given offset, or 0 if that would leave the board.
+    - backward_masks[i][offset]: the same for a move of -1.
+    - forward_flips/backward_flips[i][offset]: the mask to xor into the occupancy to
+      apply the move (the cell left behind and the cell entered).
+    - cell_owners[cell]: pairs of (vehicle index, offset) that cover the cell.
+
+    For the player vehicle 'X' it also stores:
+    - player: the index of the player vehicle.
+    - exit_row: the row the player vehicle drives along to the exit.
+    - exit_masks[offset]: the cells between the player vehicle and the exit.
+
+    tables is a dictionary for derived tables (e.g. heuristic weights) that users
+    of the bitboard compute on demand and cache with it.
+
+    Keys and occupancy masks are Python integers, so they grow as needed on large
+    boards and fleets; wide_keys/wide_occupancy tell if they may not fit in 64 bits
+    (e.g. for the arrays of util.NodeStore).
+    """
+    OFFSET_BITS = 3
+
+    def __init__(self, vehicles_list, board_w=6, board_h=6):
+        self.board_w = board_w
+        self.board_h = board_h
+        self.num_of_vehicles = len(vehicles_list)
+        self.ids = [vehicle.get_id() for vehicle in vehicles_list]
+        self.directions = [vehicle.get_direction() for vehicle in vehicles_list]
+        self.sizes = [vehicle.get_size() for vehicle in vehicles_list]
+        self.lanes = [vehicle.get_y_coordinate() if vehicle.get_direction() == 'H' else vehicle.get_x_coordinate()
+                      for vehicle in vehicles_list]
+        self.index = {vehicle_id: i for i, vehicle_id in enumerate(self.ids)}
+        if len(self.index) != self.num_of_vehicles:
+            duplicates = sorted(set(vehicle_id for vehicle_id in self.ids if self.ids.count(vehicle_id) > 1))
+            raise ValueError("vehicle " + duplicates[0] + " appears more than once")
+        self.offset_bits = max(self.OFFSET_BITS, (max(board_w, board_h) - 1).bit_length())
+        self.shifts = [self.offset_bits * i for i in range(self.num_of_vehicles)]
+        self.offset_mask = (1 << self.offset_bits) - 1
+        self.wide_keys = self.offset_bits * self.num_of_vehicles > 64
+        self.wide_occupancy = board_w * board_h > 64
+        self.cell_masks = []
+        self.forward_masks = []
+        self.backward_masks = []
+        self.forward_flips = []
+        self.backward_flips = []
+        occupancy = 0
+        for vehicle in vehicles_list:
+            mask = self.add_vehicle_tables(vehicle)
+            if occupancy & mask:
+                raise ValueError("vehicle " + vehicle.get_id() + " overlaps another vehicle")
+            occupancy |= mask
+        self.cell_owners = [[] for _ in range(board_w * board_h)]
+        for i, cell_masks in enumerate(self.cell_masks):
+            for offset, mask in enumerate(cell_masks):
+                for cell in range(board_w * board_h):
+                    if mask >> cell & 1:
+                        self.cell_owners[cell].append((i, offset))
+        self.player = self.index.get('X')
+        self.exit_row = None
+        self.exit_masks = []
+        if self.player is not None:
+            if self.directions[self.player] != 'H':
+                raise ValueError("the player vehicle must be horizontal")
+            self.exit_row = self.lanes[self.player]
+            for offset in range(len(self.cell_masks[self.player])):
+                mask = 0
+                for x in range(offset + self.sizes[self.player], board_w):
+                    mask |= self.cell(x, self.exit_row)
+                self.exit_masks.append(mask)
+        self.tables = {}
+
+    def cell(self, x, y):
+        """
+        :return: the mask of the cell in the y'th row and x'th column
+        """
+        return 1 << (y * self.board_w + x)
+
+    def add_vehicle_tables(self, vehicle):
+        """
+        Precomputes the occupancy and slide masks of a vehicle for every offset it can
+        take on the board.
+        :return: the mask of the cells the vehicle occupies at its current offset
+        """
+        size = vehicle.get_size()
+        if vehicle.get_direction() == 'H':
+            lane = vehicle.get_y_coordinate()
+            length = self.board_w
+            offset = vehicle.get_x_coordinate()
+            cell = lambda offset: self.cell(offset, lane)
+            lanes = self.board_h
+        else:
+            lane = vehicle.get_x_coordinate()
+            length = self.board_h
+            offset = vehicle.get_y_coordinate()
+            cell = lambda offset: self.cell(lane, offset)
+            lanes = self.board_w
+        if not 0 <= lane < lanes or not 0 <= offset <= length - size:
+            raise ValueError("vehicle " + vehicle.get_id() + " is out of the board")
+        start_offset = offset
+        cell_masks = []
+        forward_masks = []
+        backward_masks = []
+        for offset in range(length - size + 1):
+            mask = 0
+            for i in range(size):
+                mask |= cell(offset + i)
+            cell_masks.append(mask)
+            forward_masks.append(cell(offset + size) if offset + size < length else 0)
+            backward_masks.append(cell(offset - 1) if offset > 0 else 0)
+        self.cell_masks.append(cell_masks)
+        self.forward_masks.append(forward_masks)
+        self.backward_masks.append(backward_masks)
+        self.forward_flips.append([forward_masks[offset] | (cell(offset) if forward_masks[offset] else 0)
+                                   for offset in range(len(cell_masks))])
+        self.backward_flips.append([backward_masks[offset] | (cell(offset + size - 1) if backward_masks[offset] else 0)
+                                    for offset in range(len(cell_masks))])
+        return cell_masks[start_offset]
+
+    def get_offset(self, key, i):
+        """
+        :return: the offset of the i'th vehicle in a packed state key
+        """
+        return (key >> self.shifts[i]) & self.offset_mask
+
+    def get_vehicle_at(self, key, x, y):
+        """
+        :return: the index of the vehicle in the y'th row and x'th column of the state
+        described by the given key, or None if the cell is free
+        """
+        for i, offset in self.cell_owners[y * self.board_w + x]:
+            if (key >> self.shifts[i]) & self.offset_mask == offset:
+                return i
+        return None
+
+    def get_occupancy(self, key):
+        """
+        :return: the occupancy mask of a packed state key
+        """
+        occupancy = 0
+        for i in range(self.num_of_vehicles):
+            occupancy |= self.cell_masks[i][(key >> self.shifts[i]) & self.offset_mask]
+        return occupancy
+
+    def get_legal_moves(self, key, occupancy):
+        """
+        :return: a list of (vehicle index, wanted move) pairs of all the legal moves of
+        the state described by the given key and occupancy mask
+        """
+        moves_list = []
+        offset_mask = self.offset_mask
+        for i, shift in enumerate(self.shifts):
+            offset = (key >> shift) & offset_mask
+            forward = self.forward_masks[i][offset]
+            if forward and not occupancy & forward:
+                moves_list.append((i, 1))
+            backward = self.backward_masks[i][offset]
+            if backward and not occupancy & backward:
+                moves_list.append((i, -1))
+        return moves_list
+
+    def check_move_valid(self, key, occupancy, i, wanted_move):
+        """
+        Check if the i'th vehicle can move in the wanted direction.
+        """
+        offset = (key >> self.shifts[i]) & self.offset_mask
+        if wanted_move == 1:
+            target = self.forward_masks[i][offset]
+        else:
+            target = self.backward_masks[i][offset]
+        return target != 0 and not occupancy & target
+
+    def get_move_code(self, i, wanted_move):
+        """
+        :return: a one byte code of the move of the i'th vehicle
+        """
+        return 2 * i + (wanted_move == 1)
+
+    def decode_move(self, move_code):
+        """
+        :return: the (vehicle index, wanted move) pair of a move code
+        """
+        return move_code >> 1, 1 if move_code & 1 else -1
+
+    def apply_move(self, key, occupancy, i, wanted_move):
+        """
+        Applies a (legal) move to a state, returning the new (key, occupancy) pair.
+        """
+        offset = (key >> self.shifts[i]) & self.offset_mask
+        if wanted_move == 1:
+            return key + (1 << self.shifts[i]), occupancy ^ self.forward_flips[i][offset]
+        return key - (1 << self.shifts[i]), occupancy ^ self.backward_flips[i][offset]
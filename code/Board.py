@@ -1,6 +1,6 @@
-import numpy as np
-from Vehicle import *
-from copy import deepcopy, copy
+from Vehicle import get_board_size
+from Bitboard import Bitboard
+from copy import deepcopy
 
 
 class Board:
@@ -8,24 +8,26 @@ class Board:
     A Board describes the current state of the game board.
 
     The Board stores:
-    - board_w/board_h: the width and height of the playing area.
+    - board_w/board_h: the width and height of the playing area (see Card).
     - current_board: a 2D array of the board state.
     - player: the player vehicle, the one with id 'X'.
     - vehicles_list: A list of vehicles that exist in the board.
+    - key: a compact canonical key of the vehicles positions (see get_key).
+    - bitboard: the static bitboard tables of the card, shared by all its boards.
+    - occupancy: the occupancy mask of the board (see Bitboard).
     """
 
-    def __init__(self, vehicles_list):
-        self.board_w = 6
-        self.board_h = 6
-        self.current_board = [[' ', ' ', ' ', ' ', ' ', ' '],
-                              [' ', ' ', ' ', ' ', ' ', ' '],
-                              [' ', ' ', ' ', ' ', ' ', ' '],
-                              [' ', ' ', ' ', ' ', ' ', ' '],
-                              [' ', ' ', ' ', ' ', ' ', ' '],
-                              [' ', ' ', ' ', ' ', ' ', ' ']]
+    def __init__(self, vehicles_list, bitboard=None):
+        if bitboard is None:
+            bitboard = Bitboard(vehicles_list, *get_board_size(vehicles_list))
+        self.board_w = bitboard.board_w
+        self.board_h = bitboard.board_h
         self.vehicles_list = vehicles_list
         self.player = self.get_player()
+        self.bitboard = bitboard
         self.mark_board()
+        self.key = self.calculate_key()
+        self.occupancy = self.bitboard.get_occupancy(self.key)
 
     def get_player(self):
         for vehicle in self.vehicles_list:
@@ -36,12 +38,7 @@ class Board:
         """
         Updates the cuurent board according to all the vehicles positions.
         """
-        updated_board = [[' ', ' ', ' ', ' ', ' ', ' '],
-                         [' ', ' ', ' ', ' ', ' ', ' '],
-                         [' ', ' ', ' ', ' ', ' ', ' '],
-                         [' ', ' ', ' ', ' ', ' ', ' '],
-                         [' ', ' ', ' ', ' ', ' ', ' '],
-                         [' ', ' ', ' ', ' ', ' ', ' ']]
+        updated_board = [[' '] * self.board_w for _ in range(self.board_h)]
         for vehicle in self.vehicles_list:
             for i in range(vehicle.get_size()):
                 if vehicle.get_direction() == 'H':
@@ -50,6 +47,27 @@ class Board:
                     updated_board[vehicle.get_y_coordinate()+i][vehicle.get_x_coordinate()] = vehicle.get_id()
             self.current_board = updated_board
 
+    def calculate_key(self):
+        """
+        Packs the offset of every vehicle along its moving axis (x for horizontal
+        vehicles, y for vertical ones) into a single integer, bitboard.offset_bits
+        bits per vehicle in the order of vehicles_list. The fixed axis of a vehicle never changes, so
+        two boards of the same card are equal if and only if their keys are equal.
+        """
+        key = 0
+        for vehicle, shift in zip(self.vehicles_list, self.bitboard.shifts):
+            if vehicle.get_direction() == 'H':
+                key |= vehicle.get_x_coordinate() << shift
+            else:
+                key |= vehicle.get_y_coordinate() << shift
+        return key
+
+    def get_key(self):
+        """
+        :return: the canonical key of the current board state
+        """
+        return self.key
+
     def add_move(self, move):
         """
         Try to add the given move to the board.
@@ -68,6 +86,8 @@ class Board:
                     vehicle.set_y_coordinate(vehicle.get_y_coordinate() + move.wanted_move)
                     break
 
+        self.key, self.occupancy = self.bitboard.apply_move(self.key, self.occupancy,
+                                                            self.bitboard.index[move.vehicle_id], move.wanted_move)
         self.mark_board()
 
     def do_move(self, move):
@@ -83,26 +103,14 @@ class Board:
         """
         Returns a list of legal moves for the current board state.
         """
-        # Generate all legal moves
-        moves_list = []
-        for vehicle in self.vehicles_list:
-            forward_move = Move(vehicle.get_id(), 1)
-            if self.check_move_valid(forward_move):
-                moves_list.append(forward_move)
-            backward_move = Move(vehicle.get_id(), -1)
-            if self.check_move_valid(backward_move):
-                moves_list.append(backward_move)
-
-        return moves_list
+        ids = self.bitboard.ids
+        return [Move(ids[i], wanted_move) for i, wanted_move in self.bitboard.get_legal_moves(self.key, self.occupancy)]
 
     def check_valid_id(self, move_id):
         """
         Check if the vehicle we want to move exist in the current board.
         """
-        for vehicle in self.vehicles_list:
-            if move_id == vehicle.get_id():
-                return True
-        return False
+        return move_id in self.bitboard.index
 
     def check_move_valid(self, move):
         """
@@ -110,25 +118,8 @@ class Board:
         """
         if not self.check_valid_id(move.vehicle_id):
             return False
-
-        for vehicle in self.vehicles_list:
-            if vehicle.get_id() == move.vehicle_id:
-                if vehicle.get_direction() == 'H':
-                    if move.wanted_move == -1:
-                        if vehicle.get_x_coordinate() - 1 < 0:
-                            return False
-                        return self.current_board[vehicle.get_y_coordinate()][vehicle.get_x_coordinate() - 1] == ' '
-                    if vehicle.get_end_x_coordinate() + 1 > 5:
-                        return False
-                    return self.current_board[vehicle.get_y_coordinate()][vehicle.get_end_x_coordinate() + 1] == ' '
-                else:
-                    if move.wanted_move == -1:
-                        if vehicle.get_y_coordinate() - 1 < 0:
-                            return False
-                        return self.current_board[vehicle.get_y_coordinate() - 1][vehicle.get_x_coordinate()] == ' '
-                    if vehicle.get_end_y_coordinate() + 1 > 5:
-                        return False
-                    return self.current_board[vehicle.get_end_y_coordinate() + 1][vehicle.get_x_coordinate()] == ' '
+        return self.bitboard.check_move_valid(self.key, self.occupancy, self.bitboard.index[move.vehicle_id],
+                                              move.wanted_move)
 
     def check_tile_legal(self, x, y):
         """
@@ -153,10 +144,8 @@ class Board:
             print(cur_col)
 
     def __copy__(self):
-        cpy_board = Board(deepcopy(self.vehicles_list))
-        cpy_board.board_w = 6
-        cpy_board.board_h = 6
-        cpy_board.current_board = np.copy(self.current_board)
+        cpy_board = Board(deepcopy(self.vehicles_list), self.bitboard)
+        cpy_board.current_board = [row[:] for row in self.current_board]
         return cpy_board
 
     def equals(self, other):
@@ -164,9 +153,15 @@ class Board:
         Two board objects are equal if their current boards are the same (all
         vehicles are in the same places)
         """
-        if self.current_board == other.current_board:
-            return True
-        return False
+        return self.key == other.key
+
+    def __eq__(self, other):
+        if not isinstance(other, Board):
+            return NotImplemented
+        return self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
 
 
 class Move:
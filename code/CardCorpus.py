@@ -0,0 +1,274 @@
+import io
+import mmap
+import os
+import struct
+import sys
+from Vehicle import Card, Vehicle, available_vehicles, get_board_size
+
+"""
+Card corpora: cards read straight from a zip archive, and a compact binary
+corpus format that is memory-mapped and decoded lazily, one card at a time.
+
+A binary corpus file starts with a header (the magic, the format version, the
+record size and the number of cards), followed by one fixed-size record per card.
+A record holds the width and height of the board, then up to max_vehicles
+vehicles (MAX_VEHICLES by default) of 5 bytes each: the id, the row, the column,
+the direction and the size; the unused vehicles are zeros. The card names are
+saved in an index file next to the corpus (the corpus path + INDEX_SUFFIX), one
+name per line, in record order.
+"""
+
+MAGIC = b"RHCARDS"
+FORMAT_VERSION = 2
+HEADER = struct.Struct("<7sBHI")
+MAX_VEHICLES = len(available_vehicles)
+BOARD_SIZE = 2
+VEHICLE_SIZE = 5
+INDEX_SUFFIX = ".index"
+
+
+def parse_card(lines):
+    """
+    Parse the lines of a card. A vehicle line is either compact, e.g. "X21H" for a
+    horizontal vehicle X at row 2 and column 1, or whitespace separated with an
+    optional size, e.g. "Z 10 3 V 4" for a vertical vehicle Z of size 4 at row 10
+    and column 3 (the size is needed for the ids that aren't in
+    available_vehicles). An optional "size <width> <height>" line declares the
+    board size, 6x6 by default.
+    A line that doesn't follow this format raises a ValueError that names it.
+    :return: the Card of the vehicles
+    """
+    vehicles_list = Card()
+    for line_number, line in enumerate(lines, 1):
+        tokens = line.split()
+        if not tokens:
+            continue
+        try:
+            if tokens[0] == "size":
+                if len(tokens) != 3:
+                    raise ValueError("expected size <width> <height>")
+                vehicles_list.board_w, vehicles_list.board_h = parse_number(tokens[1], 1), parse_number(tokens[2], 1)
+                continue
+            vehicles_list.append(parse_vehicle(tokens))
+        except ValueError as e:
+            raise ValueError("line %d of the card (%r): %s" % (line_number, line.strip(), e)) from None
+    return vehicles_list
+
+
+def parse_vehicle(tokens):
+    """
+    :param tokens: the whitespace separated tokens of a vehicle line
+    :return: the Vehicle of the line
+    """
+    if len(tokens) == 1:
+        if len(tokens[0]) != 4:
+            raise ValueError("expected a vehicle like X21H")
+        vehicle_id, x_coordinate, y_coordinate, direction = tokens[0]
+        size = None
+    elif len(tokens) in (4, 5):
+        vehicle_id, x_coordinate, y_coordinate, direction = tokens[:4]
+        size = parse_number(tokens[4], 1) if len(tokens) == 5 else None
+    else:
+        raise ValueError("expected a vehicle like X 2 1 H [size]")
+    # an id is stored in a single byte of a binary corpus record
+    if len(vehicle_id) != 1 or not vehicle_id.isascii() or not vehicle_id.isalnum():
+        raise ValueError("a vehicle id is a single letter or digit")
+    if direction not in ('H', 'V'):
+        raise ValueError("the direction is H or V")
+    if size is None and vehicle_id not in available_vehicles:
+        raise ValueError("vehicle " + vehicle_id + " needs a size")
+    return Vehicle(vehicle_id, parse_number(x_coordinate), parse_number(y_coordinate), direction, size)
+
+
+def parse_number(token, minimum=0):
+    if not token.isdigit() or int(token) < minimum:
+        raise ValueError("expected a number of at least %d, got %r" % (minimum, token))
+    return int(token)
+
+
+def get_record_size(max_vehicles):
+    return BOARD_SIZE + max_vehicles * VEHICLE_SIZE
+
+
+def parse_card_or_error(lines, keep_errors=False):
+    """
+    Parse the lines of a card, see parse_card.
+    :param keep_errors: if True, the exception of a card that can't be parsed is
+    returned in place of its vehicles list
+    """
+    try:
+        return parse_card(lines)
+    except (ValueError, KeyError) as e:
+        if not keep_errors:
+            raise
+        return e
+
+
+def read_zip(path, keep_errors=False):
+    """
+    :param keep_errors: see parse_card_or_error
+    :return: a generator of the (name, vehicles list) of every card in a zip
+    archive, sorted by name
+    """
+    import zipfile
+    with zipfile.ZipFile(path) as archive:
+        for name in sorted(archive.namelist()):
+            if name.endswith("/"):
+                continue
+            with archive.open(name) as file:
+                yield os.path.basename(name), parse_card_or_error(io.TextIOWrapper(file, encoding="ascii"), keep_errors)
+
+
+def encode_card(vehicles_list, max_vehicles=MAX_VEHICLES):
+    """
+    :return: the binary record of a card
+    """
+    if len(vehicles_list) > max_vehicles:
+        raise ValueError("a card has at most %d vehicles" % max_vehicles)
+    record = bytearray(get_record_size(max_vehicles))
+    record[:BOARD_SIZE] = bytes(get_board_size(vehicles_list))
+    for i, vehicle in enumerate(vehicles_list):
+        start = BOARD_SIZE + i * VEHICLE_SIZE
+        record[start:start + VEHICLE_SIZE] = bytes(
+            (ord(vehicle.get_id()), vehicle.get_y_coordinate(), vehicle.get_x_coordinate(),
+             ord(vehicle.get_direction()), vehicle.get_size()))
+    return bytes(record)
+
+
+def decode_card(record):
+    """
+    :return: the Card of a binary record
+    """
+    vehicles_list = Card(board_w=record[0], board_h=record[1])
+    for i in range(BOARD_SIZE, len(record), VEHICLE_SIZE):
+        vehicle_id, x_coordinate, y_coordinate, direction, size = record[i:i + VEHICLE_SIZE]
+        if vehicle_id == 0:
+            break
+        vehicles_list.append(Vehicle(chr(vehicle_id), x_coordinate, y_coordinate, chr(direction), size))
+    return vehicles_list
+
+
+def write_corpus(path, cards, max_vehicles=MAX_VEHICLES):
+    """
+    Write a binary corpus and its index, streaming the cards.
+    :param cards: an iterable of (name, vehicles list) tuples
+    :param max_vehicles: the number of vehicles a record has room for
+    :return: the number of cards written
+    """
+    count = 0
+    record_size = get_record_size(max_vehicles)
+    with open(path, "wb") as corpus, open(path + INDEX_SUFFIX, "w") as index:
+        corpus.write(HEADER.pack(MAGIC, FORMAT_VERSION, record_size, 0))
+        for name, vehicles_list in cards:
+            corpus.write(encode_card(vehicles_list, max_vehicles))
+            index.write(name + "\n")
+            count += 1
+        corpus.seek(0)
+        corpus.write(HEADER.pack(MAGIC, FORMAT_VERSION, record_size, count))
+    return count
+
+
+def is_corpus(path):
+    """
+    :return: True if the file is a binary corpus
+    """
+    with open(path, "rb") as file:
+        return file.read(len(MAGIC)) == MAGIC
+
+
+class CardCorpus:
+    """
+    A memory-mapped binary corpus. Cards are decoded only when accessed: by
+    record number (corpus[i]), by name (get_card) or by iterating the (name,
+    vehicles list) tuples.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        self.header_size = HEADER.size
+        magic, version, self.record_size, self.count = HEADER.unpack(self.file.read(self.header_size))
+        if magic != MAGIC or version != FORMAT_VERSION or (self.record_size - BOARD_SIZE) % VEHICLE_SIZE:
+            self.file.close()
+            raise ValueError(path + " is not a version %d card corpus" % FORMAT_VERSION)
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if self.count > 0 else b""
+        with open(path + INDEX_SUFFIX) as index:
+            self.names = index.read().splitlines()
+        if len(self.names) != self.count:
+            self.close()
+            raise ValueError("the index of " + path + " doesn't match its records")
+        self.index = None
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.file.close()
+
+    def __len__(self):
+        return self.count
+
+    def get_record(self, i):
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+        start = self.header_size + i * self.record_size
+        return self.data[start:start + self.record_size]
+
+    def __getitem__(self, i):
+        return decode_card(self.get_record(i))
+
+    def get_name(self, i):
+        return self.names[i]
+
+    def get_card(self, name):
+        """
+        :return: the vehicles list of the card with the given name
+        """
+        if self.index is None:
+            self.index = {card_name: i for i, card_name in enumerate(self.names)}
+        return self[self.index[name]]
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield self.names[i], self[i]
+
+
+def read_cards(patterns, keep_errors=False):
+    """
+    Read the cards of card files, directories of card files, zip archives, binary
+    corpora or glob patterns of those. The files of a directory are read as card
+    files (its zip archives are skipped, as they hold copies of the cards).
+    :param keep_errors: if True, a card that can't be parsed is yielded with the
+    exception in place of its vehicles list, and the other cards are still read
+    :return: a generator of (name, vehicles list) tuples
+    """
+    # imported here, parse_card is imported by Game, which has to start fast
+    import glob
+    import zipfile
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            paths = [path for path in sorted(glob.glob(os.path.join(pattern, "*")))
+                     if os.path.isfile(path) and not path.endswith(".zip") and not path.endswith(INDEX_SUFFIX)]
+        else:
+            paths = sorted(glob.glob(pattern))
+        for path in paths:
+            if path.endswith(INDEX_SUFFIX):
+                continue
+            if zipfile.is_zipfile(path):
+                yield from read_zip(path, keep_errors)
+            elif is_corpus(path):
+                corpus = CardCorpus(path)
+                try:
+                    yield from corpus
+                finally:
+                    corpus.close()
+            else:
+                with open(path) as file:
+                    yield os.path.basename(path), parse_card_or_error(file, keep_errors)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3:
+        print("usage: python CardCorpus.py corpus_file cards...")
+        print("packs card files, directories and zip archives into a binary corpus")
+        sys.exit(1)
+    print("wrote %d cards to %s" % (write_corpus(sys.argv[1], read_cards(sys.argv[2:])), sys.argv[1]))
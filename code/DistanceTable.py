@@ -0,0 +1,186 @@
+import os
+import sys
+import numpy as np
+from collections import deque
+from State import State
+from Board import Board
+from RushHourSearch import SMALL_INTEGER_HEURISTICS
+from LayeredBFS import get_component, get_goal_distances
+
+# the type of the saved distances
+DISTANCE_DTYPE = np.uint16
+# distance of the states that can't reach a goal state
+UNSOLVABLE = int(np.iinfo(DISTANCE_DTYPE).max)
+
+
+class DistanceTable:
+    """
+    The exact distance to the nearest goal of every state of a card's connected
+    component (all the states reachable from the card's initial state).
+
+    The DistanceTable stores:
+    - keys: the sorted canonical keys of the states, as a uint64 array (an object
+      array of Python integers if the keys may not fit in 64 bits, see
+      Bitboard.wide_keys; such tables can't be saved).
+    - distances: a DISTANCE_DTYPE array of the distances, aligned with keys
+      (UNSOLVABLE for the states that can't reach a goal).
+
+    A table is saved as two .npy files that can be memory-mapped when loaded, so
+    many processes can share a single copy of it.
+    """
+
+    def __init__(self, bitboard, keys, distances):
+        self.bitboard = bitboard
+        self.keys = keys
+        self.distances = distances
+
+    @staticmethod
+    def build(start_state):
+        """
+        Enumerate the connected component of the given state, then compute the
+        distance of each of its states by a breadth first search backwards from
+        all the goal states of the component. Both searches are layered BFS (see
+        LayeredBFS), except on the boards that don't fit in 64 bits.
+        """
+        bitboard = start_state.bitboard
+        if not bitboard.wide_keys and not bitboard.wide_occupancy:
+            keys, occupancies = get_component(start_state)
+            return DistanceTable(bitboard, keys, to_distances(get_goal_distances(bitboard, keys, occupancies, -1)))
+        occupancies = {start_state.key: start_state.occupancy}
+        fringe = deque([start_state.key])
+        while fringe:
+            key = fringe.popleft()
+            occupancy = occupancies[key]
+            for i, wanted_move in bitboard.get_legal_moves(key, occupancy):
+                next_key, next_occupancy = bitboard.apply_move(key, occupancy, i, wanted_move)
+                if next_key not in occupancies:
+                    occupancies[next_key] = next_occupancy
+                    fringe.append(next_key)
+
+        # moves are reversible, so searching backwards uses the same moves
+        distances = {}
+        for key, occupancy in occupancies.items():
+            if State(bitboard, key, occupancy).is_goal():
+                distances[key] = 0
+                fringe.append(key)
+        while fringe:
+            key = fringe.popleft()
+            occupancy = occupancies[key]
+            for i, wanted_move in bitboard.get_legal_moves(key, occupancy):
+                next_key, next_occupancy = bitboard.apply_move(key, occupancy, i, wanted_move)
+                if next_key not in distances:
+                    distances[next_key] = distances[key] + 1
+                    fringe.append(next_key)
+
+        keys = np.array(sorted(occupancies), dtype=object if bitboard.wide_keys else np.uint64)
+        table_distances = np.array([distances.get(int(key), -1) for key in keys], dtype=np.int64)
+        return DistanceTable(bitboard, keys, to_distances(table_distances))
+
+    @staticmethod
+    def get_file_names(path):
+        return path + ".keys.npy", path + ".distances.npy"
+
+    def save(self, path):
+        if self.keys.dtype == object:
+            raise ValueError("only tables of keys of up to 64 bits can be saved")
+        keys_file, distances_file = self.get_file_names(path)
+        np.save(keys_file, self.keys)
+        np.save(distances_file, self.distances)
+
+    @staticmethod
+    def load(path, bitboard, mmap=True):
+        """
+        Load a table saved by save. The bitboard must be the one of the card the
+        table was built for, since the keys depend on the order of its vehicles.
+        """
+        keys_file, distances_file = DistanceTable.get_file_names(path)
+        mmap_mode = 'r' if mmap else None
+        distances = np.load(distances_file, mmap_mode=mmap_mode)
+        if distances.dtype != DISTANCE_DTYPE:
+            raise ValueError(distances_file + " holds " + str(distances.dtype) + " distances, rebuild the table")
+        return DistanceTable(bitboard, np.load(keys_file, mmap_mode=mmap_mode), distances)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def get_distance(self, state):
+        """
+        :return: the distance of the state to the nearest goal, UNSOLVABLE if it
+        can't reach a goal, or None if the state is not in the table
+        """
+        index = np.searchsorted(self.keys, state.key if self.keys.dtype == object else np.uint64(state.key))
+        if index == len(self.keys) or self.keys[index] != state.key:
+            return None
+        return int(self.distances[index])
+
+    def solve(self, state):
+        """
+        Walk the table from the given state to a goal.
+        :return: a shortest list of (state, move) tuples, or [] if the state is
+        not in the table or can't reach a goal
+        """
+        distance = self.get_distance(state)
+        if distance is None or distance == UNSOLVABLE:
+            return []
+        action_array = []
+        while distance > 0:
+            for next_state, move in state.get_successors():
+                if self.get_distance(next_state) == distance - 1:
+                    action_array.append((state, move))
+                    state = next_state
+                    distance -= 1
+                    break
+        return action_array
+
+
+def to_distances(distances):
+    """
+    :param distances: an integer array of distances, -1 for the states that
+    can't reach a goal
+    :return: the distances as a DISTANCE_DTYPE array, UNSOLVABLE for the states
+    that can't reach a goal
+    """
+    longest = distances.max(initial=-1)
+    if longest >= UNSOLVABLE:
+        raise ValueError("a distance of %d doesn't fit in a distance table" % longest)
+    return np.where(distances < 0, UNSOLVABLE, distances).astype(DISTANCE_DTYPE)
+
+
+def distance_table_heuristic(state, problem):
+    """
+    The perfect heuristic: the exact distance of the state to the nearest goal.
+    The table of the problem is built on first use, unless one was loaded into
+    problem.distance_table beforehand.
+    """
+    table = getattr(problem, 'distance_table', None)
+    if table is None:
+        table = DistanceTable.build(problem.get_start_state())
+        problem.distance_table = table
+    return table.get_distance(state)
+
+
+SMALL_INTEGER_HEURISTICS.add(distance_table_heuristic)
+
+
+def build_tables(cards_dir, tables_dir):
+    """
+    Build and save the distance table of every card in cards_dir.
+    """
+    from Game import parse_file
+    os.makedirs(tables_dir, exist_ok=True)
+    for file_name in sorted(os.listdir(cards_dir)):
+        path = os.path.join(cards_dir, file_name)
+        if not os.path.isfile(path) or file_name.endswith('.zip'):
+            continue
+        try:
+            start_state = State.from_board(Board(parse_file(path)))
+        except ValueError as e:
+            print(file_name + ": skipped, " + str(e))
+            continue
+        table = DistanceTable.build(start_state)
+        table.save(os.path.join(tables_dir, file_name))
+        print(file_name + ": " + str(len(table)) + " states, distance " + str(table.get_distance(start_state)))
+
+
+if __name__ == '__main__':
+    build_tables(sys.argv[1] if len(sys.argv) > 1 else "cards", sys.argv[2] if len(sys.argv) > 2 else "tables")
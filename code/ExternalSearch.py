@@ -0,0 +1,405 @@
+import math
+import os
+import shutil
+import tempfile
+import numpy as np
+from Board import Move
+from State import State
+from LayeredBFS import expand_layer, get_goals, get_key_dtype, get_layer_tables, is_in_sorted
+
+"""
+External memory breadth first search: the layers of a layered BFS (see
+LayeredBFS) are moved to files on disk when they don't fit in RAM, so the number
+of states it can enumerate is bounded by the disk rather than the memory. The
+layers are held in RAM as long as they fit in the RAM budget together, and the
+oldest ones are written to disk first.
+
+A layer is split into 2 ** bucket_bits buckets by the top bucket_bits bits of a
+hash of the state keys, and every bucket is a sorted array (a .npy file on disk)
+of records (key, occupancy, move), where move is the code of the move that
+reached the state (see Bitboard.get_move_code), which is the parent link:
+undoing it gives the parent state in the previous layer. All the layers use the
+same hash, so the keys of a bucket of one layer can only be in a single bucket of
+a layer with fewer bits, or in a range of consecutive buckets of a layer with
+more bits. On the boards whose keys or occupancy masks may not fit in 64 bits
+(see Bitboard.wide_keys), the key and occupancy of a record are fixed-size byte
+strings (the little endian bytes of the integers) instead of uint64.
+
+To build the next layer, the current one is read in chunks that fit in the RAM
+budget, and the successors of every chunk are buffered by bucket of the next
+layer; once the buffers exceed the RAM budget they are appended to one spill file
+per bucket. Duplicates are only removed afterwards (delayed duplicate
+detection): each bucket, sized to fit in the RAM budget, is sorted and
+deduplicated, and the states of the matching buckets of the previous two layers
+are removed from it, so every bucket of those layers is loaded once per layer.
+"""
+
+RECORD = np.dtype([('key', '<u8'), ('occupancy', '<u8'), ('move', 'u1')])
+# the move of the start state
+NO_MOVE = 255
+DEFAULT_RAM_BUDGET = 256 * 2 ** 20
+# used to scramble the state keys before they are mapped to a bucket
+HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+
+def get_record_dtype(bitboard):
+    """
+    :return: the dtype of the records of a card: RECORD, or records of byte strings
+    if its keys or occupancy masks may not fit in 64 bits
+    """
+    if get_key_dtype(bitboard) != object:
+        return RECORD
+    key_size = (bitboard.offset_bits * bitboard.num_of_vehicles + 7) // 8
+    occupancy_size = (bitboard.board_w * bitboard.board_h + 7) // 8
+    return np.dtype([('key', 'S%d' % key_size), ('occupancy', 'S%d' % occupancy_size), ('move', 'u1')])
+
+
+def encode(values, dtype):
+    """
+    :param values: keys or occupancy masks (see LayeredBFS.get_key_dtype)
+    :param dtype: the dtype of the record field
+    :return: the record field of the values
+    """
+    if dtype.kind == 'S':
+        return np.array([int(value).to_bytes(dtype.itemsize, 'little') for value in values], dtype=dtype)
+    return np.asarray(values, dtype=dtype)
+
+
+def decode(field):
+    """
+    :return: the keys or occupancy masks of a record field (see encode)
+    """
+    if field.dtype.kind == 'S':
+        return np.array([int.from_bytes(value, 'little') for value in field], dtype=object)
+    return np.array(field)
+
+
+def decode_value(value):
+    """
+    :return: the key or occupancy mask of the field of a single record
+    """
+    if isinstance(value, bytes):
+        return int.from_bytes(value, 'little')
+    return int(value)
+
+
+def get_buckets(keys, bucket_bits):
+    """
+    :param keys: the key field of records
+    :return: the bucket of every key, the top bucket_bits bits of its hash
+    """
+    if bucket_bits == 0:
+        return np.zeros(len(keys), dtype=np.uint64)
+    if keys.dtype.kind == 'S':
+        # fold the wide keys to 64 bits first: the hash of a non negative integer
+        # is its value modulo 2 ** 61 - 1, the same in every process
+        keys = np.array([hash(int.from_bytes(key, 'little')) for key in keys], dtype=np.uint64)
+    return (keys * HASH_MULTIPLIER) >> np.uint64(64 - bucket_bits)
+
+
+def get_bucket_bits(num_of_buckets):
+    """
+    :return: the number of bits of the smallest power of two of at least
+    num_of_buckets buckets
+    """
+    return max(0, num_of_buckets - 1).bit_length()
+
+
+class Layer:
+    """
+    A BFS layer: 2 ** bucket_bits sorted record arrays, held in RAM until the
+    layer is spilled to disk.
+    """
+
+    def __init__(self, directory, depth, bucket_bits, dtype=RECORD):
+        self.directory = directory
+        self.depth = depth
+        self.bucket_bits = bucket_bits
+        self.num_of_buckets = 1 << bucket_bits
+        self.dtype = dtype
+        self.size = 0
+        # the buckets held in RAM, by bucket number
+        self.buckets = {}
+        self.in_ram = True
+        self.saved = []
+
+    def get_file_name(self, bucket):
+        return os.path.join(self.directory, "layer%d.%d.npy" % (self.depth, bucket))
+
+    def get_spill_file_name(self, bucket):
+        return os.path.join(self.directory, "layer%d.%d.spill" % (self.depth, bucket))
+
+    def get_ram_size(self):
+        """
+        :return: the number of bytes of the buckets held in RAM
+        """
+        return sum(records.nbytes for records in self.buckets.values())
+
+    def load(self, bucket):
+        """
+        :return: the records of a bucket, memory-mapped if it is on disk
+        """
+        records = self.buckets.get(bucket)
+        if records is None:
+            records = np.load(self.get_file_name(bucket), mmap_mode='r')
+        return records
+
+    def save(self, bucket, records):
+        if self.in_ram:
+            self.buckets[bucket] = records
+        else:
+            self.write(bucket, records)
+        self.size += len(records)
+
+    def write(self, bucket, records):
+        np.save(self.get_file_name(bucket), records)
+        self.saved.append(bucket)
+
+    def spill(self):
+        """
+        Move the buckets held in RAM to disk, and the buckets saved later too.
+        """
+        for bucket, records in self.buckets.items():
+            self.write(bucket, records)
+        self.buckets = {}
+        self.in_ram = False
+
+    def contains(self, keys, bucket, bucket_bits):
+        """
+        :param keys: keys that are all in the given bucket of a partition in
+        2 ** bucket_bits buckets
+        :return: a boolean array of which keys are in the layer, loading only the
+        buckets of the layer that can hold them
+        """
+        if self.bucket_bits <= bucket_bits:
+            return is_in_sorted(self.load(bucket >> (bucket_bits - self.bucket_bits))['key'], keys)
+        found = np.zeros(len(keys), dtype=bool)
+        buckets = get_buckets(keys, self.bucket_bits)
+        first = bucket << (self.bucket_bits - bucket_bits)
+        for own_bucket in range(first, first + (1 << (self.bucket_bits - bucket_bits))):
+            in_bucket = np.flatnonzero(buckets == own_bucket)
+            if len(in_bucket):
+                found[in_bucket] = is_in_sorted(self.load(own_bucket)['key'], keys[in_bucket])
+        return found
+
+    def find(self, key):
+        """
+        :return: the record of a key, or None
+        """
+        keys = encode([key], self.dtype['key'])
+        records = self.load(int(get_buckets(keys, self.bucket_bits)[0]))
+        index = np.searchsorted(records['key'], keys[0])
+        if index < len(records) and records['key'][index] == keys[0]:
+            return records[index]
+        return None
+
+    def chunks(self, chunk_size):
+        """
+        :return: a generator of chunks of at most chunk_size records of the layer
+        """
+        for bucket in range(self.num_of_buckets):
+            records = self.load(bucket)
+            for start in range(0, len(records), chunk_size):
+                yield records[start:start + chunk_size]
+
+    def delete(self):
+        """
+        Delete the files of the layer.
+        """
+        for bucket in self.saved:
+            os.remove(self.get_file_name(bucket))
+        self.saved = []
+
+
+class ExternalBFS:
+    """
+    An external memory BFS of a card from a start state, one layer at a time (see
+    the module documentation).
+    :param directory: where the layers are written, a temporary directory that is
+    removed by close if not given (close only deletes the layer files from a
+    given directory)
+    :param ram_budget: the approximate number of bytes of states held in RAM at
+    once: it sets the size of the chunks a layer is expanded in, the number of
+    buckets of every layer and when the layers are written to disk
+    """
+
+    def __init__(self, start_state, directory=None, ram_budget=DEFAULT_RAM_BUDGET, stats=None):
+        self.bitboard = start_state.bitboard
+        get_layer_tables(self.bitboard)
+        self.record_dtype = get_record_dtype(self.bitboard)
+        self.temporary = directory is None
+        self.directory = tempfile.mkdtemp(prefix="rushhour") if directory is None else directory
+        os.makedirs(self.directory, exist_ok=True)
+        self.ram_budget = ram_budget
+        self.stats = stats
+        # a state has at most two moves per vehicle
+        self.max_successors = 2 * self.bitboard.num_of_vehicles
+        first = Layer(self.directory, 0, 0, self.record_dtype)
+        first.save(0, self.get_records([start_state.key], [start_state.occupancy], [NO_MOVE]))
+        self.layers = [first]
+
+    def close(self):
+        if self.temporary:
+            shutil.rmtree(self.directory, ignore_errors=True)
+        else:
+            for layer in self.layers:
+                layer.delete()
+
+    def get_records(self, keys, occupancies, moves):
+        """
+        :return: the records of states
+        """
+        records = np.empty(len(keys), dtype=self.record_dtype)
+        records['key'] = encode(keys, self.record_dtype['key'])
+        records['occupancy'] = encode(occupancies, self.record_dtype['occupancy'])
+        records['move'] = moves
+        return records
+
+    def get_chunk_size(self):
+        """
+        :return: the number of states whose successors fit in the RAM budget
+        """
+        return max(1, self.ram_budget // (self.record_dtype.itemsize * (self.max_successors + 1)))
+
+    def fit_in_ram(self, layers):
+        """
+        Spill the oldest of the given layers to disk until the rest fit in the RAM
+        budget.
+        """
+        ram_size = sum(layer.get_ram_size() for layer in layers)
+        for layer in layers:
+            if ram_size <= self.ram_budget:
+                break
+            if layer.in_ram:
+                ram_size -= layer.get_ram_size()
+                layer.spill()
+
+    def expand(self):
+        """
+        Build the next layer from the last one.
+        :return: the new layer, or None if the search is over (the new layer is
+        empty)
+        """
+        layer = self.layers[-1]
+        previous = self.layers[-2] if len(self.layers) > 1 else None
+        next_layer = Layer(self.directory, layer.depth + 1, get_bucket_bits(
+            math.ceil(layer.size * self.max_successors * self.record_dtype.itemsize / self.ram_budget)),
+            self.record_dtype)
+        buffers = [[] for _ in range(next_layer.num_of_buckets)]
+        buffered = 0
+        spilled = False
+        generated = 0
+        try:
+            for chunk in layer.chunks(self.get_chunk_size()):
+                keys, occupancies, moves = expand_layer(self.bitboard, decode(chunk['key']),
+                                                        decode(chunk['occupancy']))
+                generated += len(keys)
+                records = self.get_records(keys, occupancies, moves)
+                buckets = get_buckets(records['key'], next_layer.bucket_bits)
+                for bucket in range(next_layer.num_of_buckets):
+                    buffers[bucket].append(records[buckets == bucket])
+                buffered += records.nbytes
+                if buffered > self.ram_budget:
+                    for bucket in range(next_layer.num_of_buckets):
+                        with open(next_layer.get_spill_file_name(bucket), "ab" if spilled else "wb") as spill_file:
+                            for bucket_records in buffers[bucket]:
+                                spill_file.write(bucket_records.tobytes())
+                        buffers[bucket] = []
+                    buffered = 0
+                    spilled = True
+            for bucket in range(next_layer.num_of_buckets):
+                if spilled:
+                    spill_file_name = next_layer.get_spill_file_name(bucket)
+                    buffers[bucket].insert(0, np.fromfile(spill_file_name, dtype=self.record_dtype))
+                    os.remove(spill_file_name)
+                records = np.concatenate(buffers[bucket]) if buffers[bucket] else \
+                    np.zeros(0, dtype=self.record_dtype)
+                buffers[bucket] = None
+                _, index = np.unique(records['key'], return_index=True)
+                records = records[index]
+                new = ~layer.contains(records['key'], bucket, next_layer.bucket_bits)
+                if previous is not None:
+                    new &= ~previous.contains(records['key'], bucket, next_layer.bucket_bits)
+                next_layer.save(bucket, records[new])
+                self.fit_in_ram(self.layers + [next_layer])
+        except BaseException:
+            next_layer.delete()
+            if spilled:
+                for bucket in range(next_layer.num_of_buckets):
+                    if os.path.exists(next_layer.get_spill_file_name(bucket)):
+                        os.remove(next_layer.get_spill_file_name(bucket))
+            raise
+        if self.stats is not None:
+            self.stats.add_expansions(layer.size, generated)
+            self.stats.duplicates += generated - next_layer.size
+            self.stats.update_sizes(next_layer.size, sum(layer.size for layer in self.layers))
+        if next_layer.size == 0:
+            next_layer.delete()
+            return None
+        self.layers.append(next_layer)
+        return next_layer
+
+    def find_goal(self, layer):
+        """
+        :return: the record of a goal state of the layer, or None
+        """
+        for chunk in layer.chunks(self.get_chunk_size()):
+            goals = np.flatnonzero(get_goals(self.bitboard, decode(chunk['key']), decode(chunk['occupancy'])))
+            if len(goals):
+                return chunk[goals[0]]
+        return None
+
+    def get_path(self, record):
+        """
+        Follow the parent links from a record of the last layer to the start state.
+        :return: the list of (state, move) tuples from the start state
+        """
+        bitboard = self.bitboard
+        key, occupancy = decode_value(record['key']), decode_value(record['occupancy'])
+        move_code = int(record['move'])
+        action_array = []
+        for layer in reversed(self.layers[:-1]):
+            i, wanted_move = bitboard.decode_move(move_code)
+            key, occupancy = bitboard.apply_move(key, occupancy, i, -wanted_move)
+            action_array.append((State(bitboard, key, occupancy), Move(bitboard.ids[i], wanted_move)))
+            move_code = int(layer.find(key)['move'])
+        action_array.reverse()
+        return action_array
+
+
+def external_bfs(problem, heuristic=None, directory=None, ram_budget=DEFAULT_RAM_BUDGET):
+    """
+    Breadth first search with the layers on disk (see ExternalBFS).
+    :return: a shortest list of (state, move) tuples
+    """
+    if problem.is_unsolvable():
+        return []
+    search = ExternalBFS(problem.get_start_state(), directory, ram_budget, problem.stats)
+    try:
+        layer = search.layers[0]
+        while layer is not None:
+            goal = search.find_goal(layer)
+            if goal is not None:
+                return search.get_path(goal)
+            layer = search.expand()
+        return []
+    finally:
+        search.close()
+
+
+def enumerate_component(start_state, directory=None, ram_budget=DEFAULT_RAM_BUDGET):
+    """
+    Enumerate all the states reachable from a state with an external memory BFS.
+    :return: the list of the layer sizes
+    """
+    search = ExternalBFS(start_state, directory, ram_budget)
+    try:
+        while search.expand() is not None:
+            pass
+        return [layer.size for layer in search.layers]
+    finally:
+        search.close()
+
+
+# Abbreviations
+ebfs = external_bfs
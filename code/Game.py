@@ -1,6 +1,22 @@
-import Vehicle
-from RushHourSearch import *
+import random
+import sys
 import time
+import Vehicle
+from RushHourSearch import RushHourSearch, astar, ida, ida_star, bibfs, null_heuristic, \
+    distance_heuristic, blocking_heuristic, blocked_blocking_heuristic, blocking_and_distance_heuristic, \
+    blocked_and_distance_heuristic, power_distance_heuristic, manhattan_heuristic, board_division_heuristic
+from PatternDatabase import pattern_database_heuristic
+from AnytimeSearch import anytime_a_star
+from ParallelSearch import hda_star
+from CardCorpus import parse_card
+
+"""
+Game.py runs a single card. Without arguments it asks for a difficulty, an
+algorithm and a heuristic and solves a random card of the cards folder; with
+arguments it is a non-interactive command line solver (see main). The modules
+that are slow to import (numpy, sqlite3, multiprocessing) are only imported by
+the algorithms, heuristics and options that use them.
+"""
 
 EASY = "1"
 NUM_OF_EASY_BOARDS = 20
@@ -8,6 +24,10 @@ MEDIUM = "2"
 NUM_OF_MEDIUM_BOARDS = 12
 HARD = "3"
 NUM_OF_HARD_BOARDS = 8
+# the bundled cards whose vehicles overlap, they are never picked
+INVALID_CARDS = {"easy14", "easy16"}
+# the solutions of the interactive runs are cached here
+CACHE_FILE = "solutions.sqlite"
 HEURISTICS = {"1": null_heuristic,
     "2": distance_heuristic,
     "3": blocking_heuristic,
@@ -16,37 +36,44 @@ HEURISTICS = {"1": null_heuristic,
     "6": blocked_and_distance_heuristic,
     "7": power_distance_heuristic,
     "8": manhattan_heuristic,
-    "9": board_division_heuristic}
-ALGORITHM = {"1": astar, "2": ida}
+    "9": board_division_heuristic,
+    "10": pattern_database_heuristic}
+ALGORITHM = {"1": astar, "2": ida, "3": bibfs, "4": anytime_a_star, "5": hda_star}
+ALGORITHM_NAMES = {"astar": astar, "ida": ida, "bibfs": bibfs, "anytime": anytime_a_star, "hda": hda_star}
+HEURISTIC_NAMES = {heuristic.__name__[:-len("_heuristic")]: heuristic for heuristic in HEURISTICS.values()}
+OUTPUT_FORMATS = ["moves", "json", "boards"]
 
 
 def parse_file(rushhour_file):
     """
     this function parses the rush hour game
     """
-    file = open(rushhour_file)
-    vehicles_list = []
-    for line in file:
-        if line.endswith('\n'):
-            line = line[:-1]
-        vehicle_id, x_coordinate, y_coordinate, direction = line
-        vehicles_list.append(Vehicle(vehicle_id, int(x_coordinate), int(y_coordinate), direction))
-    file.close()
-    return vehicles_list
+    with open(rushhour_file) as file:
+        return parse_card(file)
 
 
 def get_game_file(difficulty):
     """
-    select a board according to a given difficulty
+    select a board according to a given difficulty, except the INVALID_CARDS
+    """
+    while True:
+        file_name = pick_game_file(difficulty)
+        if file_name not in INVALID_CARDS:
+            return file_name
+
+
+def pick_game_file(difficulty):
+    """
+    select a random board of a given difficulty
     """
     if difficulty == EASY:
-        random_game_number = np.random.randint(1, NUM_OF_EASY_BOARDS)
+        random_game_number = random.randrange(1, NUM_OF_EASY_BOARDS)
         return "easy" + str(random_game_number)  # should there be an extension like .txt
     if difficulty == MEDIUM:
-        random_game_number = np.random.randint(1, NUM_OF_MEDIUM_BOARDS)
+        random_game_number = random.randrange(1, NUM_OF_MEDIUM_BOARDS)
         return "medium" + str(random_game_number)  # should there be an extension like .txt
     if difficulty == HARD:
-        random_game_number = np.random.randint(1, NUM_OF_HARD_BOARDS)
+        random_game_number = random.randrange(1, NUM_OF_HARD_BOARDS)
         return "hard" + str(random_game_number)  # should there be an extension like .txt
 
 
@@ -87,7 +114,7 @@ def print_backtrace(backtrace, vehicles_list, expanded):
     print("\nCongratulations! The game was solved in "+str(len(backtrace))+" steps, expanding "+ str(expanded)+ " nodes.")
 
 
-def calculate_results_to_csv(level, index):
+def calculate_results_to_csv(level, index, algorithm=ida_star, heuristic=blocking_heuristic):
     """
     this function creates a csv file with the results of a run.
     """
@@ -101,25 +128,96 @@ def calculate_results_to_csv(level, index):
     print(file_name + "Level to solve:")
     rushHour.board.print_board()
     start = time.time()
-    backtrace = ida_star(rushHour, blocking_heuristic)
+    backtrace = algorithm(rushHour, heuristic)
     file.write(str(rushHour.expanded) + ",")
     end = time.time()
     file.write(str(end-start) + ",")
     file.write(str(len(backtrace)) + "\n")
-    print_backtrace(backtrace, vehicles_list)
+    file.close()
+    print_backtrace(backtrace, vehicles_list, rushHour.expanded)
 
 
-def solve_game_and_print(fileName, algorithm, heuristic):
-    path = "cards/" + fileName
-    vehicles_list = parse_file(path)
+def solve_card(vehicles_list, algorithm, heuristic, cache=None):
+    """
+    Solve a card.
+    :param cache: an optional SolutionCache, looked up before searching and
+    updated with the new solutions
+    :return: a tuple of the RushHourSearch problem and the solution, a list of
+    (state, move) tuples, or None if the card has no solution
+    """
     rushHour = RushHourSearch(vehicles_list)
-    backtrace = algorithm(rushHour, heuristic)
-    print_backtrace(backtrace, vehicles_list, rushHour.expanded)
+    if rushHour.is_unsolvable():
+        return rushHour, None
+    backtrace = None
+    if cache is not None:
+        from SolutionCache import get_version
+        version = get_version(algorithm, heuristic)
+        backtrace = cache.lookup(rushHour.get_start_state(), version)
+    if backtrace is None:
+        backtrace = algorithm(rushHour, heuristic)
+        if not backtrace and not rushHour.is_goal_state(rushHour.get_start_state()):
+            return rushHour, None
+        if cache is not None:
+            cache.store(backtrace, version, rushHour.get_start_state() if not backtrace else None)
+    return rushHour, backtrace
 
 
-if __name__ == '__main__':
+def print_solution(rushHour, backtrace, vehicles_list):
+    """
+    Print the boards and moves of a solution of solve_card.
+    """
+    if backtrace is None:
+        rushHour.board.print_board()
+        reason = ": " + rushHour.unsolvable_reason if rushHour.is_unsolvable() else ""
+        print("\nThis game has no solution" + reason + ".")
+    elif not backtrace:
+        rushHour.board.print_board()
+        print("\nThe game is already solved.")
+    else:
+        print_backtrace(backtrace, vehicles_list, rushHour.expanded)
+
+
+def get_result(rushHour, backtrace, vehicles_list):
+    """
+    :return: a json serializable dictionary of a solution of solve_card, in the
+    format of the SolverService results
+    """
+    if backtrace is None:
+        result = {"status": "unsolvable" if rushHour.is_unsolvable() else "unsolved", "moves": []}
+        if rushHour.is_unsolvable():
+            result["reason"] = rushHour.unsolvable_reason
+    else:
+        result = {"status": "solved",
+                  "moves": [{"vehicle": move.vehicle_id, "move": move.wanted_move,
+                             "direction": get_move_direction(move, vehicles_list)} for _, move in backtrace],
+                  "length": len(backtrace)}
+    result["expanded"] = rushHour.expanded
+    return result
+
+
+def solve_game_and_print(fileName, algorithm, heuristic, cache=None):
+    """
+    Solve a card of the cards folder and print the solution.
+    :param cache: an optional SolutionCache (see solve_card)
+    """
+    try:
+        vehicles_list = parse_file("cards/" + fileName)
+        rushHour, backtrace = solve_card(vehicles_list, algorithm, heuristic, cache)
+    except ValueError as e:
+        print("This card is invalid: " + str(e) + ".")
+        return
+    print_solution(rushHour, backtrace, vehicles_list)
+
+
+def play():
+    """
+    The interactive game: asks for a difficulty, an algorithm and a heuristic and
+    solves a random card of that difficulty.
+    """
     difficulty = input("Please choose difficulty of game:\n\tfor easy press 1\n\tfor medium press 2\n\tfor hard press 3\n")
-    algorithm = input("Please choose a search algorithm to use:\n\t for A* press 1\n\t for IDA* press 2\n")
+    algorithm = input("Please choose a search algorithm to use:\n\t for A* press 1\n\t for IDA* press 2"
+                      "\n\t for bidirectional BFS press 3\n\t for anytime weighted A* (1 second budget) press 4"
+                      "\n\t for parallel A* (HDA*, on all the cores) press 5\n")
     heuristic = input("Please choose a heuristic for the search algorithm:"
                       "\n\t for null heuristic press 1"
                       "\n\t for distance heuristic press 2"
@@ -129,8 +227,66 @@ if __name__ == '__main__':
                       "\n\t for blocked blocking cars and distance heuristic press 6"
                       "\n\t for power of distance heuristic press 7"
                       "\n\t for manhattan distance heuristic press 8"
-                      "\n\t for board division heuristic press 9\n")
+                      "\n\t for board division heuristic press 9"
+                      "\n\t for pattern database heuristic press 10\n")
     file_name = get_game_file(difficulty)
     print("Solving card "+file_name+"...")
-    solve_game_and_print(file_name, ALGORITHM[algorithm], HEURISTICS[heuristic])
+    from SolutionCache import SolutionCache
+    cache = SolutionCache(CACHE_FILE)
+    solve_game_and_print(file_name, ALGORITHM[algorithm], HEURISTICS[heuristic], cache)
+    cache.close()
     print()
+
+
+def main(argv=None):
+    """
+    The command line solver: solves a single card and prints the solution as one
+    "<vehicle> <direction>" line per move, as json, or as boards.
+    :return: the exit status, 0 if the card was solved and 1 otherwise (2 for a
+    card that can't be read or is invalid)
+    """
+    import argparse
+    parser = argparse.ArgumentParser(description="Solve a Rush Hour card. Without arguments, asks for a difficulty, "
+                                                 "an algorithm and a heuristic and solves a random card.")
+    parser.add_argument("card", help="a card file, or - to read the card from the standard input")
+    parser.add_argument("-a", "--algorithm", choices=list(ALGORITHM_NAMES), default="astar")
+    parser.add_argument("-H", "--heuristic", choices=list(HEURISTIC_NAMES), default="blocking")
+    parser.add_argument("-f", "--format", choices=OUTPUT_FORMATS, default="moves")
+    parser.add_argument("--cache", default=None, help="an SQLite solution cache file to look up and update")
+    args = parser.parse_args(argv)
+    cache = None
+    if args.cache:
+        from SolutionCache import SolutionCache
+        cache = SolutionCache(args.cache)
+    start = time.time()
+    try:
+        vehicles_list = parse_card(sys.stdin) if args.card == "-" else parse_file(args.card)
+        rushHour, backtrace = solve_card(vehicles_list, ALGORITHM_NAMES[args.algorithm],
+                                         HEURISTIC_NAMES[args.heuristic], cache)
+    except OSError as e:
+        parser.exit(2, "cannot read the card: " + str(e) + "\n")
+    except ValueError as e:
+        parser.exit(2, "invalid card: " + str(e) + "\n")
+    finally:
+        if cache is not None:
+            cache.close()
+    if args.format == "json":
+        import json
+        result = get_result(rushHour, backtrace, vehicles_list)
+        result["time"] = time.time() - start
+        print(json.dumps(result))
+    elif args.format == "boards":
+        print_solution(rushHour, backtrace, vehicles_list)
+    elif backtrace is None:
+        print("no solution" + (": " + rushHour.unsolvable_reason if rushHour.is_unsolvable() else ""),
+              file=sys.stderr)
+    else:
+        for _, move in backtrace:
+            print(move.vehicle_id + " " + get_move_direction(move, vehicles_list))
+    return 0 if backtrace is not None else 1
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        sys.exit(main())
+    play()
@@ -0,0 +1,190 @@
+import numpy as np
+from Board import Move
+from State import State
+
+"""
+Layer synchronous breadth first search: a whole BFS layer is a pair of NumPy
+arrays of packed state keys and occupancy masks (see Bitboard), the successors of
+a layer are generated with a few vectorized bit operations per vehicle and
+direction, and the duplicates are removed by sorting instead of one set lookup
+per state. The arrays are uint64 arrays, or object arrays of Python integers on
+the boards whose keys or occupancy masks may not fit in 64 bits (see
+Bitboard.wide_keys), which are slower but use the same vectorized code.
+
+Every move changes a single vehicle offset by one, so a successor of a state of
+layer d is in layer d - 1, d or d + 1: a layer is deduplicated against the
+previous two only, and no set of all the visited states is kept.
+"""
+
+
+def get_key_dtype(bitboard):
+    """
+    :return: the dtype of the key and occupancy arrays of a card: uint64, or object
+    if they may not fit in 64 bits
+    """
+    if bitboard.wide_keys or bitboard.wide_occupancy:
+        return np.dtype(object)
+    return np.dtype(np.uint64)
+
+
+def to_array(values, bitboard):
+    """
+    :return: an array of keys or occupancy masks of a card
+    """
+    return np.array(values, dtype=get_key_dtype(bitboard))
+
+
+def get_layer_tables(bitboard):
+    """
+    :return: the NumPy move tables of a card, computed once and cached in the
+    bitboard: for every vehicle its key shift and its forward/backward target and
+    flip masks by offset, and the exit masks by player offset
+    """
+    tables = bitboard.tables.get('layers')
+    if tables is None:
+        # the scalars of an object array are Python integers
+        number = int if get_key_dtype(bitboard) == object else np.uint64
+        tables = {'vehicles': [(number(bitboard.shifts[i]),
+                                to_array(bitboard.forward_masks[i], bitboard),
+                                to_array(bitboard.backward_masks[i], bitboard),
+                                to_array(bitboard.forward_flips[i], bitboard),
+                                to_array(bitboard.backward_flips[i], bitboard))
+                               for i in range(bitboard.num_of_vehicles)],
+                  'offset_mask': number(bitboard.offset_mask),
+                  'zero': number(0),
+                  'one': number(1),
+                  'exit_masks': to_array(bitboard.exit_masks, bitboard)}
+        bitboard.tables['layers'] = tables
+    return tables
+
+
+def expand_layer(bitboard, keys, occupancies):
+    """
+    :return: a tuple of the keys, occupancies and move codes (see
+    Bitboard.get_move_code) of all the successors of the given states, with
+    repetitions
+    """
+    tables = get_layer_tables(bitboard)
+    offset_mask = tables['offset_mask']
+    zero = tables['zero']
+    next_keys = []
+    next_occupancies = []
+    moves = []
+    for i, (shift, forward_masks, backward_masks, forward_flips, backward_flips) in enumerate(tables['vehicles']):
+        offsets = ((keys >> shift) & offset_mask).astype(np.intp)
+        step = tables['one'] << shift
+        for targets, flips, wanted_move in ((forward_masks, forward_flips, 1), (backward_masks, backward_flips, -1)):
+            target = targets[offsets]
+            legal = (target != zero) & ((occupancies & target) == zero)
+            moved_keys = keys[legal]
+            next_keys.append(moved_keys + step if wanted_move == 1 else moved_keys - step)
+            next_occupancies.append(occupancies[legal] ^ flips[offsets[legal]])
+            moves.append(np.full(len(moved_keys), bitboard.get_move_code(i, wanted_move), dtype=np.uint8))
+    return np.concatenate(next_keys), np.concatenate(next_occupancies), np.concatenate(moves)
+
+
+def is_in_sorted(sorted_keys, keys):
+    """
+    :return: a boolean array of which keys are in the sorted array sorted_keys
+    """
+    if len(sorted_keys) == 0:
+        return np.zeros(len(keys), dtype=bool)
+    index = np.searchsorted(sorted_keys, keys)
+    index[index == len(sorted_keys)] = 0
+    return sorted_keys[index] == keys
+
+
+def get_goals(bitboard, keys, occupancies):
+    """
+    :return: a boolean array of which states are goal states
+    """
+    tables = get_layer_tables(bitboard)
+    player_shift = tables['vehicles'][bitboard.player][0]
+    player_offsets = ((keys >> player_shift) & tables['offset_mask']).astype(np.intp)
+    return (occupancies & tables['exit_masks'][player_offsets]) == tables['zero']
+
+
+def bfs_layers(bitboard, keys, occupancies, stats=None):
+    """
+    Breadth first search from a set of states (the first layer, whose keys must be
+    sorted and unique).
+    :return: a generator of the (keys, occupancies) layers, keys sorted
+    """
+    previous_keys = keys[:0]
+    while len(keys):
+        yield keys, occupancies
+        next_keys, next_occupancies, _ = expand_layer(bitboard, keys, occupancies)
+        generated = len(next_keys)
+        next_keys, index = np.unique(next_keys, return_index=True)
+        next_occupancies = next_occupancies[index]
+        new = ~(is_in_sorted(keys, next_keys) | is_in_sorted(previous_keys, next_keys))
+        if stats is not None:
+            stats.add_expansions(len(keys), generated)
+            stats.duplicates += generated - int(new.sum())
+            stats.update_sizes(len(keys), stats.expanded)
+        previous_keys = keys
+        keys, occupancies = next_keys[new], next_occupancies[new]
+
+
+def get_component(start_state):
+    """
+    Enumerate the connected component of a state (all the states reachable from it).
+    :return: a tuple of the sorted keys of the component and their occupancies
+    """
+    bitboard = start_state.bitboard
+    layers = list(bfs_layers(bitboard, to_array([start_state.key], bitboard),
+                             to_array([start_state.occupancy], bitboard)))
+    keys = np.concatenate([layer_keys for layer_keys, _ in layers])
+    occupancies = np.concatenate([layer_occupancies for _, layer_occupancies in layers])
+    order = np.argsort(keys)
+    return keys[order], occupancies[order]
+
+
+def get_goal_distances(bitboard, keys, occupancies, unreachable):
+    """
+    Breadth first search backwards from all the goal states of a component (moves
+    are reversible, so it uses the same moves).
+    :param keys: the sorted keys of the component
+    :param unreachable: the distance of the states that can't reach a goal
+    :return: an array of the distance of every state to the nearest goal
+    """
+    distances = np.full(len(keys), unreachable, dtype=np.int64)
+    goals = get_goals(bitboard, keys, occupancies)
+    for distance, (layer_keys, _) in enumerate(bfs_layers(bitboard, keys[goals], occupancies[goals])):
+        distances[np.searchsorted(keys, layer_keys)] = distance
+    return distances
+
+
+def layered_bfs(problem, heuristic=None):
+    """
+    Breadth first search a layer at a time. The path to the first goal state is
+    rebuilt backwards, from every state to a neighbour in the previous layer.
+    :return: a shortest list of (state, move) tuples
+    """
+    if problem.is_unsolvable():
+        return []
+    start_state = problem.get_start_state()
+    bitboard = start_state.bitboard
+    layers = []
+    for keys, occupancies in bfs_layers(bitboard, to_array([start_state.key], bitboard),
+                                        to_array([start_state.occupancy], bitboard), problem.stats):
+        goals = np.flatnonzero(get_goals(bitboard, keys, occupancies))
+        if len(goals):
+            state = State(bitboard, int(keys[goals[0]]), int(occupancies[goals[0]]))
+            break
+        layers.append(keys)
+    else:
+        return []
+    action_array = []
+    for previous_keys in reversed(layers):
+        for previous_state, move in state.get_successors():
+            if is_in_sorted(previous_keys, to_array([previous_state.key], bitboard))[0]:
+                action_array.append((previous_state, Move(move.vehicle_id, -move.wanted_move)))
+                state = previous_state
+                break
+    action_array.reverse()
+    return action_array
+
+
+# Abbreviations
+lbfs = layered_bfs
@@ -0,0 +1,257 @@
+import time
+from Board import Move
+from State import State
+from RushHourSearch import RushHourSearch, a_star_search, null_heuristic
+import util
+
+"""
+Hash distributed A* (HDA*): every state is owned by one worker process, chosen by
+hashing its key. A worker keeps the open and closed lists of the states it owns,
+expands them, and sends every successor to its owner.
+
+The search runs in synchronous rounds. In a round every worker adds the
+successors it received to its lists, reports the lowest f of its open list and
+the cheapest goal it reached to the coordinator (the calling process), and, if
+the coordinator doesn't stop the search, expands up to batch_size nodes of the
+lowest f over all the workers (so the nodes are expanded in the order of A*, a
+whole f layer in parallel) that are below the cost of the best solution so far.
+The successors are sent as one
+batch per worker and per round, so when the reports are made no successor is in
+flight, and the search stops exactly when no open node anywhere can lead to a
+cheaper solution. The solution is then traced back by asking the owner of every
+state for its parent.
+"""
+
+# the maximal number of nodes a worker expands per round
+HDA_BATCH_SIZE = 256
+# used to scramble the state keys before they are mapped to a worker
+HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+# how often (in seconds) the coordinator checks that the workers are alive while
+# it waits for a report
+REPORT_TIMEOUT = 1.0
+
+
+def get_owner(key, processes):
+    """
+    :return: the index of the worker that owns a state key
+    """
+    return ((key ^ (key >> 29)) * HASH_MULTIPLIER >> 32) % processes
+
+
+class HDAWorker:
+    """
+    The part of the search a single worker owns: its nodes (g, occupancy, h,
+    parent key and move code by state key) and its open list.
+    """
+
+    def __init__(self, index, processes, vehicles_list, heuristic):
+        self.index = index
+        self.processes = processes
+        self.problem = RushHourSearch(vehicles_list)
+        self.bitboard = self.problem.get_start_state().bitboard
+        self.heuristic = heuristic
+        self.nodes = {}
+        self.closed = set()
+        self.fringe = util.PriorityQueue()
+        self.open_size = 0
+        self.best_goal = (float('inf'), None)
+
+    def add(self, key, occupancy, g, parent_key, move_code):
+        """
+        Add a state reached with cost g, unless it was already reached as cheaply.
+        """
+        stats = self.problem.stats
+        node = self.nodes.get(key)
+        if node is not None and node[0] <= g:
+            stats.duplicates += 1
+            return
+        state = State(self.bitboard, key, occupancy)
+        if node is None:
+            start = time.perf_counter()
+            h = self.heuristic(state, self.problem)
+            stats.heuristic_time += time.perf_counter() - start
+        else:
+            h = node[2]
+            self.closed.discard(key)
+        self.nodes[key] = (g, occupancy, h, parent_key, move_code)
+        if state.is_goal():
+            if g < self.best_goal[0]:
+                self.best_goal = (g, key)
+            return
+        self.fringe.push(key, g + h, g)
+        self.open_size += 1
+
+    def get_min_f(self):
+        """
+        :return: the lowest f of the open list, skipping the stale entries
+        """
+        heap = self.fringe.heap
+        while heap:
+            f, depth, _, key = heap[0]
+            if key not in self.closed and self.nodes[key][0] == -depth:
+                return f
+            self.fringe.pop()
+            self.open_size -= 1
+        return float('inf')
+
+    def expand(self, f_limit, bound, batch_size):
+        """
+        Expand up to batch_size open nodes whose f is at most f_limit and below
+        bound.
+        :return: the list of successor batches, one per worker
+        """
+        batches = [[] for _ in range(self.processes)]
+        expanded = 0
+        while expanded < batch_size and self.get_min_f() <= f_limit and self.get_min_f() < bound:
+            key = self.fringe.pop()
+            self.open_size -= 1
+            self.closed.add(key)
+            expanded += 1
+            g, occupancy, _, _, _ = self.nodes[key]
+            for next_state, next_move, next_cost in self.problem.get_successors(State(self.bitboard, key, occupancy)):
+                i = self.bitboard.index[next_move.vehicle_id]
+                batches[get_owner(next_state.key, self.processes)].append(
+                    (next_state.key, next_state.occupancy, g + next_cost, key,
+                     self.bitboard.get_move_code(i, next_move.wanted_move)))
+        self.problem.stats.update_sizes(self.open_size, len(self.closed))
+        return batches
+
+    def get_report(self):
+        stats = self.problem.stats
+        return (self.index, self.get_min_f(), self.best_goal, stats.expanded, stats.generated, stats.duplicates,
+                stats.peak_open, stats.peak_closed)
+
+
+def hda_worker(index, processes, vehicles_list, heuristic, batch_size, inboxes, commands, reports):
+    """
+    The main loop of a worker process. An exception is reported to the
+    coordinator instead of a report.
+    """
+    try:
+        run_worker(index, processes, vehicles_list, heuristic, batch_size, inboxes, commands, reports)
+    except Exception as e:
+        reports.put(e)
+
+
+def run_worker(index, processes, vehicles_list, heuristic, batch_size, inboxes, commands, reports):
+    worker = HDAWorker(index, processes, vehicles_list, heuristic)
+    start_state = worker.problem.get_start_state()
+    if get_owner(start_state.key, processes) == index:
+        worker.add(start_state.key, start_state.occupancy, 0, None, None)
+    while True:
+        reports.put(worker.get_report())
+        command, argument = commands[index].get()
+        if command != "expand":
+            break
+        batches = worker.expand(*argument, batch_size)
+        for other in range(processes):
+            if other != index:
+                inboxes[other].put(batches[other])
+        for successor in batches[index]:
+            worker.add(*successor)
+        for _ in range(processes - 1):
+            for successor in inboxes[index].get():
+                worker.add(*successor)
+    # trace the solution: answer parent queries until told to exit
+    while command == "parent":
+        _, _, _, parent_key, move_code = worker.nodes[argument]
+        reports.put((parent_key, move_code))
+        command, argument = commands[index].get()
+
+
+def get_report(reports, workers):
+    """
+    :return: the next report of a worker, raising the exceptions of the workers,
+    and a RuntimeError if a worker process died without reporting one
+    """
+    from queue import Empty
+    while True:
+        try:
+            report = reports.get(timeout=REPORT_TIMEOUT)
+            break
+        except Empty:
+            for index, worker in enumerate(workers):
+                if not worker.is_alive():
+                    raise RuntimeError("HDA* worker %d died with exit code %s" % (index, worker.exitcode))
+    if isinstance(report, Exception):
+        raise report
+    return report
+
+
+def hda_star(problem, heuristic=null_heuristic, processes=None, batch_size=HDA_BATCH_SIZE):
+    """
+    Hash distributed A* on processes worker processes (all the cores by default),
+    see the module documentation. With an admissible heuristic the solution is
+    optimal, like the one of a_star_search.
+    In a daemonic process (e.g. a multiprocessing.Pool worker), which can't start
+    processes of its own, or with a single process, it runs a_star_search instead.
+    If a worker process dies, the other workers are terminated and a RuntimeError
+    is raised.
+    """
+    # imported here, as Game imports this module and multiprocessing is slow to import
+    import multiprocessing
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    if processes < 2 or multiprocessing.current_process().daemon:
+        return a_star_search(problem, heuristic)
+    start_state = problem.get_start_state()
+    if problem.is_goal_state(start_state) or problem.is_unsolvable():
+        return []
+    vehicles_list = start_state.get_vehicles_list()
+    inboxes = [multiprocessing.Queue() for _ in range(processes)]
+    commands = [multiprocessing.Queue() for _ in range(processes)]
+    reports = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=hda_worker, args=(index, processes, vehicles_list, heuristic,
+                                                                batch_size, inboxes, commands, reports))
+               for index in range(processes)]
+    for worker in workers:
+        worker.start()
+    stats = problem.stats
+    finished = False
+    try:
+        best_cost, goal_key = float('inf'), None
+        while True:
+            min_f = float('inf')
+            totals = [0] * 5
+            for _ in range(processes):
+                _, worker_min_f, (goal_cost, worker_goal_key), *counts = get_report(reports, workers)
+                min_f = min(min_f, worker_min_f)
+                if goal_cost < best_cost:
+                    best_cost, goal_key = goal_cost, worker_goal_key
+                totals = [total + count for total, count in zip(totals, counts)]
+            stats.add_expansions(totals[0] - stats.expanded, totals[1] - stats.generated)
+            stats.duplicates = totals[2]
+            stats.update_sizes(totals[3], totals[4])
+            if min_f >= best_cost or min_f == float('inf'):
+                break
+            for command in commands:
+                command.put(("expand", (min_f, best_cost)))
+        moves = []
+        key = goal_key
+        while key is not None:
+            commands[get_owner(key, processes)].put(("parent", key))
+            key, move_code = get_report(reports, workers)
+            if key is not None:
+                moves.append(move_code)
+        for command in commands:
+            command.put(("exit", None))
+        finished = True
+    finally:
+        for worker in workers:
+            if finished:
+                worker.join()
+            else:
+                worker.terminate()
+    bitboard = start_state.bitboard
+    action_array = []
+    state = start_state
+    for move_code in reversed(moves):
+        i, wanted_move = bitboard.decode_move(move_code)
+        action_array.append((state, Move(bitboard.ids[i], wanted_move)))
+        key, occupancy = bitboard.apply_move(state.key, state.occupancy, i, wanted_move)
+        state = State(bitboard, key, occupancy)
+    return action_array
+
+
+# Abbreviations
+hda = hda_star
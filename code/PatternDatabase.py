@@ -0,0 +1,101 @@
+from Bitboard import Bitboard
+from State import State
+from RushHourSearch import SMALL_INTEGER_HEURISTICS
+
+# the maximal number of vehicles in a pattern, including the player vehicle
+MAX_PATTERN_VEHICLES = 12
+
+
+class PatternDatabase:
+    """
+    A pattern database of a card: the exact distances of an abstraction of the card
+    that keeps only some of its vehicles (the pattern) and removes the others.
+
+    The pattern is the player vehicle, the vertical vehicles that cross the exit
+    row on the right of the player vehicle, and then the vehicles that can block
+    those (vehicles that can occupy a cell in their columns). Removing vehicles
+    only removes obstacles, so every move of the card is a move of the abstraction
+    and the abstract distance never overestimates the real one.
+
+    The PatternDatabase stores:
+    - pattern: the indices of the pattern vehicles in the card's vehicles list.
+    - bitboard: the bitboard of the abstraction.
+    - distances: a dictionary from the abstract state keys to their distances,
+      computed by a backward search from the abstract goal states.
+    """
+
+    def __init__(self, start_state, max_vehicles=MAX_PATTERN_VEHICLES):
+        self.pattern = get_pattern(start_state, max_vehicles)
+        vehicles_list = start_state.get_vehicles_list()
+        self.bitboard = Bitboard([vehicles_list[i] for i in self.pattern],
+                                 start_state.bitboard.board_w, start_state.bitboard.board_h)
+        self.shifts = [(start_state.bitboard.shifts[i], self.bitboard.shifts[k]) for k, i in enumerate(self.pattern)]
+        # DistanceTable needs numpy, which is only imported once a database is built
+        from DistanceTable import DistanceTable
+        key = self.get_abstract_key(start_state)
+        table = DistanceTable.build(State(self.bitboard, key, self.bitboard.get_occupancy(key)))
+        self.distances = dict(zip(table.keys.tolist(), table.distances.tolist()))
+
+    def get_abstract_key(self, state):
+        """
+        :return: the key of the abstraction of the given state
+        """
+        key = state.key
+        offset_mask = self.bitboard.offset_mask
+        abstract_key = 0
+        for shift, abstract_shift in self.shifts:
+            abstract_key |= ((key >> shift) & offset_mask) << abstract_shift
+        return abstract_key
+
+    def get_distance(self, state):
+        return self.distances[self.get_abstract_key(state)]
+
+
+def get_pattern(state, max_vehicles=MAX_PATTERN_VEHICLES):
+    """
+    choose the vehicles of the pattern database abstraction of a state, most
+    relevant first.
+    :return: a list of vehicle indices
+    """
+    bitboard = state.bitboard
+    player = bitboard.player
+    exit_column = state.get_player_offset() + bitboard.sizes[player]
+    crossing = [i for i in range(bitboard.num_of_vehicles)
+                if bitboard.directions[i] == 'V' and bitboard.lanes[i] >= exit_column]
+    # the vehicles that block the exit row right now come first
+    crossing.sort(key=lambda i: not state.occupancy & bitboard.cell_masks[i][state.get_offset(i)] &
+                  bitboard.exit_masks[state.get_player_offset()])
+    pattern = [player] + crossing
+    # then the vehicles that can get in the way of the pattern vehicles, layer by
+    # layer (the blockers of the crossing vehicles, then their blockers...), the
+    # ones that are in the way right now first
+    layer = crossing
+    while layer and len(pattern) < max_vehicles:
+        reach = 0
+        for i in layer:
+            for mask in bitboard.cell_masks[i]:
+                reach |= mask
+        layer = [i for i in range(bitboard.num_of_vehicles)
+                 if i not in pattern and any(mask & reach for mask in bitboard.cell_masks[i])]
+        layer.sort(key=lambda i: not bitboard.cell_masks[i][state.get_offset(i)] & reach)
+        pattern += layer
+    return pattern[:max_vehicles]
+
+
+def pattern_database_heuristic(board, problem):
+    """
+    A heuristic function estimates the cost from the current state to the
+    nearest goal in the provided SearchProblem. The pattern database heuristic
+    is the exact distance to the goal of an abstraction of the board that keeps
+    only the player vehicle, the vehicles crossing the exit row and the vehicles
+    blocking those (see PatternDatabase). The database is built on first use.
+    """
+    pattern_database = getattr(problem, 'pattern_database', None)
+    if pattern_database is None:
+        pattern_database = PatternDatabase(problem.get_start_state())
+        problem.pattern_database = pattern_database
+        problem.stats.check()
+    return pattern_database.get_distance(board)
+
+
+SMALL_INTEGER_HEURISTICS.add(pattern_database_heuristic)
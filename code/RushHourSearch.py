@@ -1,8 +1,21 @@
-from Board import *
+from Board import Board, Move
+from State import State
+from SearchStats import SearchStats
+from Solvability import get_unsolvability_reason
 import util
+import math
+import time
+from collections import OrderedDict
 
 BFS = "BFS"
 DFS = "DFS"
+# default size of the IDA* transposition table, 0 disables it
+IDA_TABLE_SIZE = 2 ** 20
+# default capacity of a MemoizedHeuristic
+HEURISTIC_MEMO_SIZE = 2 ** 18
+# bidirectional_search falls back to a breadth first search if a card has more
+# goal states than this
+MAX_GOAL_STATES = 2 ** 16
 
 """
 RushHourSearch is the class representing the search problem
@@ -10,40 +23,59 @@ RushHourSearch is the class representing the search problem
 
 
 class RushHourSearch:
-    def __init__(self, vehicle_list):
+    def __init__(self, vehicle_list, stats=None):
         """
         Initialize the search problem with a board with a given vehicle list
+        :param stats: the SearchStats to fill in (e.g. with a progress callback),
+        a new one by default
         """
         self.board = Board(vehicle_list)
-        self.expanded = 0
+        self.start_state = State.from_board(self.board)
+        self.stats = stats if stats is not None else SearchStats()
+        # why the card is proven unsolvable (see Solvability), or None
+        self.unsolvable_reason = get_unsolvability_reason(self.start_state)
+
+    @property
+    def expanded(self):
+        return self.stats.expanded
+
+    @property
+    def generated(self):
+        return self.stats.generated
 
     def get_start_state(self):
         """
         Returns the start state for the search problem
         """
-        return self.board
+        return self.start_state
 
-    def is_goal_state(self, board):
+    def is_goal_state(self, state):
         """
-        board: Search state
+        state: Search state
         Returns True if and only if the state is a valid goal state
         """
-        for i in range(2, 6):
-            if i > board.player.x+1 and board.current_board[2][i] != ' ':
-                return False
-        return True
+        return state.is_goal()
+
+    def is_unsolvable(self):
+        """
+        Returns True if no goal state is reachable from the start state, as proven
+        by a static analysis of the card (the searches then return [] at once)
+        """
+        return self.unsolvable_reason is not None
 
-    def get_successors(self, board):
+    def get_successors(self, state):
         """
-        board: Search state
+        state: Search state
         For a given board, this should return a list of triples,
         (successor, move, stepCost), where 'successor' is a
         successor to the current state, 'move' is the action
         required to get there, and 'stepCost' is the incremental
         cost of expanding to that successor
         """
-        self.expanded = self.expanded + 1
-        return [(board.do_move(move), move, 1) for move in board.get_legal_moves()]
+        start = time.perf_counter()
+        successors = [(successor, move, 1) for successor, move in state.get_successors()]
+        self.stats.add_expansion(len(successors), time.perf_counter() - start)
+        return successors
 
 
 ##########################
@@ -68,6 +100,21 @@ def get_path(moves_dict, solution_board):
     return action_array
 
 
+def get_node_path(nodes, bitboard, node):
+    """
+    generate an array of all the states and moves (as tuples) from the root of a
+    node store to the given node, rebuilding the states and moves of the path only.
+    :param nodes: a util.NodeStore
+    """
+    action_array = []
+    path = nodes.get_path(node)
+    for parent, child in zip(path, path[1:]):
+        i, wanted_move = bitboard.decode_move(nodes.moves[child])
+        action_array.append((State(bitboard, nodes.keys[parent], nodes.occupancies[parent]),
+                             Move(bitboard.ids[i], wanted_move)))
+    return action_array
+
+
 def current_board_is_visited(current_board, visited):
     """
     check if the current board was visited in the search
@@ -75,39 +122,77 @@ def current_board_is_visited(current_board, visited):
     :param visited: set of visited boards
     :return: true if and only if the board appears in visited boards set
     """
-    for board in visited:
-        if current_board.equals(board):
-            return True
+    return current_board in visited
 
 
-def vehicle_is_blocked(board, x_index):
+def vehicle_is_blocked(state, x_index):
     """
-    this function checks if a car is blocked on the vertical axis.
-    :param board:
+    this function checks if the car in the exit row and the x_index column is
+    blocked on both sides of its moving axis.
+    :param state:
     :param x_index:
     :return:
     """
-    vehicle_id = board.current_board[2][x_index]
-    cur_vehicle = get_vehicle(board, vehicle_id)
-    y_bound = cur_vehicle.get_y_coordinate()
-    vehicle_size = cur_vehicle.get_size()
-    lower_bound = y_bound + vehicle_size - 1
-    if ((y_bound == 0 or (y_bound > 0 and board.current_board[y_bound-1]
-    [x_index] != ' '))
-            and (lower_bound == 5 or (lower_bound < 5 and board.current_board
-            [lower_bound+1][x_index] != ' '))):
-        return True
-
-
-def get_vehicle(board, index):
-    """
-    :param board:
-    :param index:
-    :return: return a Vehicle object for a given
-    """
-    for vehicle in board.vehicles_list:
-        if vehicle.get_id() == index:
-            return vehicle
+    bitboard = state.bitboard
+    i = state.get_vehicle_at(x_index, bitboard.exit_row)
+    offset = state.get_offset(i)
+    backward = bitboard.backward_masks[i][offset]
+    forward = bitboard.forward_masks[i][offset]
+    return (backward == 0 or state.occupancy & backward != 0) and \
+        (forward == 0 or state.occupancy & forward != 0)
+
+
+def get_goal_states(state, max_goal_states=None):
+    """
+    generate all the goal states that are consistent with the given state: the
+    path of the player vehicle to the exit is free, no two vehicles overlap and
+    vehicles that share a lane keep their order (they can't pass each other).
+    :param state:
+    :param max_goal_states: if given, the enumeration stops as soon as there are
+    more goal states than this
+    :return: a list of states, or None if there are more than max_goal_states
+    """
+    bitboard = state.bitboard
+    order = [bitboard.player] + [i for i in range(bitboard.num_of_vehicles) if i != bitboard.player]
+    # for every vehicle, the vehicles placed before it in the same lane, and
+    # whether they must stay in front of it
+    lane_constraints = []
+    for k, i in enumerate(order):
+        constraints = []
+        for j in order[:k]:
+            if bitboard.directions[j] == bitboard.directions[i] and bitboard.lanes[j] == bitboard.lanes[i]:
+                constraints.append((j, state.get_offset(j) < state.get_offset(i)))
+        lane_constraints.append(constraints)
+    goal_states = []
+    if not place_vehicles(bitboard, order, lane_constraints, 0, 0, 0, goal_states, max_goal_states):
+        return None
+    return goal_states
+
+
+def place_vehicles(bitboard, order, lane_constraints, k, key, occupancy, goal_states, max_goal_states=None):
+    """
+    place the vehicles order[k:] in every consistent way on top of a partial goal
+    state, adding the complete goal states to goal_states.
+    :return: False if the enumeration stopped at more than max_goal_states goal
+    states, True otherwise
+    """
+    if k == len(order):
+        goal_states.append(State(bitboard, key, bitboard.get_occupancy(key)))
+        return max_goal_states is None or len(goal_states) <= max_goal_states
+    i = order[k]
+    for offset, mask in enumerate(bitboard.cell_masks[i]):
+        if occupancy & mask:
+            continue
+        if not all((bitboard.get_offset(key, j) < offset) == in_front for j, in_front in lane_constraints[k]):
+            continue
+        next_occupancy = occupancy | mask
+        if i == bitboard.player:
+            # keep the path to the exit free
+            next_occupancy |= bitboard.exit_masks[offset]
+        if not place_vehicles(bitboard, order, lane_constraints, k + 1, key | (offset << bitboard.shifts[i]),
+                              next_occupancy, goal_states, max_goal_states):
+            return False
+    return True
 
 
 class PQItem:
@@ -131,10 +216,12 @@ def distance_heuristic(board, problem=None):
     A heuristic function estimates the cost from the current state to the nearest
     goal in the provided SearchProblem. This is the distance from the goal state
     """
-    x_index = board.get_player().get_x_coordinate()
-    if x_index > 3:
+    bitboard = board.bitboard
+    x_index = board.get_player_offset()
+    last_index = bitboard.board_w - bitboard.sizes[bitboard.player]
+    if x_index > last_index:
         return 0
-    return 4 - x_index
+    return last_index - x_index
 
 
 def power_distance_heuristic(board, problem=None):
@@ -152,11 +239,7 @@ def blocking_heuristic(board, problem=None):
     goal in the provided SearchProblem.  The blocking heuristic which is equal to zero at any goal state, and is equal
     to one plus the number of cars blocking the path to the exit in all other states.
     """
-    counter = 0
-    for i in range(2, 6):
-        if i > board.player.x + 1 and board.current_board[2][i] != ' ':
-            counter += 1
-    return counter
+    return (board.occupancy & board.bitboard.exit_masks[board.get_player_offset()]).bit_count()
 
 
 def blocked_blocking_heuristic(board, problem=None):
@@ -167,11 +250,14 @@ def blocked_blocking_heuristic(board, problem=None):
     two points.
     """
     counter = 0
-    for i in range(2, 6):
-        if i > board.player.x + 1 and board.current_board[2][i] != ' ':
-            if vehicle_is_blocked(board, i):
-                counter += 1
+    bitboard = board.bitboard
+    blocking = board.occupancy & bitboard.exit_masks[board.get_player_offset()]
+    while blocking:
+        cell = blocking & -blocking
+        blocking ^= cell
+        if vehicle_is_blocked(board, (cell.bit_length() - 1) % bitboard.board_w):
             counter += 1
+        counter += 1
     return counter
 
 
@@ -200,16 +286,34 @@ def weight_heuristic(board, weight_function):
     the player cell).
     """
     counter = 0
-    x = board.player.get_x_coordinate()
-    y = board.player.get_y_coordinate()
-    board = board.current_board
-    for i, row in enumerate(board):
-        for j, col in enumerate(row):
-            if board[i][j] != ' ' and board[i][j] != 'X':
-                counter += weight_function(x, y, j, i)
+    weights = get_weight_table(board.bitboard, weight_function)[board.get_player_offset()]
+    occupied = board.occupancy
+    while occupied:
+        cell = occupied & -occupied
+        occupied ^= cell
+        counter += weights[cell.bit_length() - 1]
     return counter
 
 
+def get_weight_table(bitboard, weight_function):
+    """
+    :return: the weights of all the cells for every position of the player
+    vehicle: table[x][cell] is the weight of cell (the bit index of the cell) when
+    the player vehicle is at x, and 0 for the cells of the player vehicle. The
+    table is computed once per card and cached in the bitboard.
+    """
+    table = bitboard.tables.get(weight_function)
+    if table is None:
+        table = []
+        y = bitboard.exit_row
+        for x, player_mask in enumerate(bitboard.cell_masks[bitboard.player]):
+            table.append([0 if player_mask >> cell & 1 else
+                          weight_function(x, y, cell % bitboard.board_w, cell // bitboard.board_w)
+                          for cell in range(bitboard.board_w * bitboard.board_h)])
+        bitboard.tables[weight_function] = table
+    return table
+
+
 def calculate_manhattan_distance_helper(x_1, y_1, x_2, y_2):
     """
     this function returns 1 over the manhattan distance.
@@ -251,6 +355,178 @@ def board_division_heuristic(board, problem=None):
     return weight_heuristic(board, board_division_helper)
 
 
+# The heuristics whose values are small integers, so a_star_search can use a
+# util.BucketPriorityQueue for them (the others use util.PriorityQueue)
+SMALL_INTEGER_HEURISTICS = {null_heuristic, distance_heuristic, blocking_heuristic, blocked_blocking_heuristic,
+                            blocking_and_distance_heuristic, blocked_and_distance_heuristic}
+
+
+#########################################
+##########incremental heuristics#########
+#########################################
+def get_moved_cells(parent_state, move):
+    """
+    :return: a tuple of the index of the moved vehicle, the mask of the cell it
+    leaves and the mask of the cell it enters
+    """
+    bitboard = parent_state.bitboard
+    i = bitboard.index[move.vehicle_id]
+    offset = parent_state.get_offset(i)
+    if move.wanted_move == 1:
+        entered = bitboard.forward_masks[i][offset]
+        return i, bitboard.forward_flips[i][offset] ^ entered, entered
+    entered = bitboard.backward_masks[i][offset]
+    return i, bitboard.backward_flips[i][offset] ^ entered, entered
+
+
+def player_only_delta(heuristic):
+    """
+    :return: the delta function of a heuristic that depends only on the position
+    of the player vehicle
+    """
+    def delta(parent_value, parent_state, move, state, problem=None):
+        if move.vehicle_id == parent_state.bitboard.ids[parent_state.bitboard.player]:
+            return heuristic(state, problem)
+        return parent_value
+    return delta
+
+
+def blocking_delta(parent_value, parent_state, move, state, problem=None):
+    """
+    A vehicle that isn't the player vehicle changes the blocking count only if it
+    enters or leaves the path to the exit.
+    """
+    i, left, entered = get_moved_cells(parent_state, move)
+    bitboard = parent_state.bitboard
+    if i == bitboard.player:
+        return blocking_heuristic(state, problem)
+    exit_mask = bitboard.exit_masks[parent_state.get_player_offset()]
+    return parent_value + (entered & exit_mask != 0) - (left & exit_mask != 0)
+
+
+def blocking_and_distance_delta(parent_value, parent_state, move, state, problem=None):
+    if move.vehicle_id == parent_state.bitboard.ids[parent_state.bitboard.player]:
+        return blocking_and_distance_heuristic(state, problem)
+    return blocking_delta(parent_value, parent_state, move, state, problem)
+
+
+def weight_delta(weight_function, heuristic):
+    """
+    :return: the delta function of a weight heuristic: moving a vehicle that isn't
+    the player vehicle only changes the weights of the cell it leaves and the cell
+    it enters
+    """
+    def delta(parent_value, parent_state, move, state, problem=None):
+        i, left, entered = get_moved_cells(parent_state, move)
+        bitboard = parent_state.bitboard
+        if i == bitboard.player:
+            return heuristic(state, problem)
+        weights = get_weight_table(bitboard, weight_function)[parent_state.get_player_offset()]
+        return parent_value + weights[entered.bit_length() - 1] - weights[left.bit_length() - 1]
+    return delta
+
+
+# The heuristics that can compute the value of a successor from the value of its
+# parent and the move, see evaluate_successor
+INCREMENTAL_HEURISTICS = {
+    null_heuristic: lambda parent_value, parent_state, move, state, problem=None: 0,
+    distance_heuristic: player_only_delta(distance_heuristic),
+    power_distance_heuristic: player_only_delta(power_distance_heuristic),
+    blocking_heuristic: blocking_delta,
+    blocking_and_distance_heuristic: blocking_and_distance_delta,
+    manhattan_heuristic: weight_delta(calculate_manhattan_distance_helper, manhattan_heuristic),
+    board_division_heuristic: weight_delta(board_division_helper, board_division_heuristic)}
+
+
+def evaluate_successor(heuristic, parent_value, parent_state, move, state, problem=None):
+    """
+    Evaluate the heuristic on a successor state, incrementally from the value of
+    its parent state if the heuristic supports it, and from scratch otherwise.
+    :param parent_value: the heuristic value of parent_state
+    :param move: the move from parent_state to state
+    """
+    if isinstance(heuristic, MemoizedHeuristic):
+        return heuristic.evaluate_successor(parent_value, parent_state, move, state, problem)
+    delta = INCREMENTAL_HEURISTICS.get(heuristic)
+    if delta is None:
+        return heuristic(state, problem)
+    return delta(parent_value, parent_state, move, state, problem)
+
+
+def is_small_integer_heuristic(heuristic):
+    if isinstance(heuristic, MemoizedHeuristic):
+        heuristic = heuristic.heuristic
+    return heuristic in SMALL_INTEGER_HEURISTICS
+
+
+#####################################
+##########memoized heuristics########
+#####################################
+class MemoizedHeuristic:
+    """
+    Wraps a heuristic with a bounded memo of its values keyed by state key, so a
+    state that is generated again (a transposition in A*, or the shallow tree that
+    every IDA* iteration re-expands) isn't evaluated again. The least recently
+    used values are dropped above capacity.
+    A memo only serves the states of a single card: it is cleared when it gets a
+    state of another card.
+    e.g. a_star_search(problem, MemoizedHeuristic(blocked_blocking_heuristic))
+    """
+
+    def __init__(self, heuristic, capacity=HEURISTIC_MEMO_SIZE):
+        self.heuristic = heuristic
+        self.capacity = capacity
+        self.__name__ = getattr(heuristic, '__name__', str(heuristic))
+        self.memo = OrderedDict()
+        self.bitboard = None
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, state):
+        """
+        :return: the memoized value of the state, or None
+        """
+        if state.bitboard is not self.bitboard:
+            self.clear()
+            self.bitboard = state.bitboard
+        value = self.memo.get(state.key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.memo.move_to_end(state.key)
+        return value
+
+    def store(self, state, value):
+        self.memo[state.key] = value
+        if len(self.memo) > self.capacity:
+            self.memo.popitem(last=False)
+
+    def __call__(self, state, problem=None):
+        value = self.lookup(state)
+        if value is None:
+            value = self.heuristic(state, problem)
+            self.store(state, value)
+        return value
+
+    def evaluate_successor(self, parent_value, parent_state, move, state, problem=None):
+        value = self.lookup(state)
+        if value is None:
+            value = evaluate_successor(self.heuristic, parent_value, parent_state, move, state, problem)
+            self.store(state, value)
+        return value
+
+    def clear(self):
+        self.memo.clear()
+
+    def get_hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups > 0 else 0.0
+
+    def __len__(self):
+        return len(self.memo)
+
+
 ######################################
 ##########search algorithms###########
 ######################################
@@ -261,12 +537,15 @@ def general_search(problem, type):
         fringe = util.Queue()
     else:
         return
+    if problem.is_unsolvable():
+        return []
     moves_dict = {}
     visited = set()
     # fringe is the data structure with a board and the cost of the move.
     fringe.push((problem.get_start_state(), None, 1))
     # moves dictionary is a dictionary for each board to its father and the cost of the action
     moves_dict[problem.get_start_state()] = (None, None, 1)
+    stats = problem.stats
     while not fringe.is_empty():
         current_board, current_move, current_cost = fringe.pop()
         if problem.is_goal_state(current_board):
@@ -276,9 +555,12 @@ def general_search(problem, type):
             current_board_successors = problem.get_successors(current_board)
             for next_board, next_move, next_cost in current_board_successors:
                 if not current_board_is_visited(next_board, visited) and \
-                        next_board not in moves_dict.keys():
+                        next_board not in moves_dict:
                     moves_dict[next_board] = (current_board, next_move, next_cost)
                     fringe.push((next_board, next_move, next_cost))
+                else:
+                    stats.duplicates += 1
+            stats.update_sizes(len(fringe.list), len(visited))
     return []
 
 
@@ -306,85 +588,301 @@ def breadth_first_search(problem):
     return general_search(problem, BFS)
 
 
-def a_star_search(problem, heuristic=null_heuristic):
-    """
-    Search the node that has the lowest combined cost and heuristic first.
-    """
-    fringe = util.PriorityQueue()
-    moves_dict = {}
-    visited = set()
-    # fringe is the data structure with a board and the cost of the move.
-    item = PQItem((problem.get_start_state(), None, 0))
-    fringe.push(item, 0)
-    # moves dictionary is a dictionary for each board to its father and the cost of the action
-    moves_dict[problem.get_start_state()] = (None, None, 0)
-    while not fringe.is_empty():
-        current_board, current_move, current_cost = fringe.pop().data
-        if problem.is_goal_state(current_board):
-            return get_path(moves_dict, current_board)
-        if not current_board_is_visited(current_board, visited):
-            visited.add(current_board)
-            current_board_successors = problem.get_successors(current_board)
-            for next_board, next_move, next_cost in current_board_successors:
-                if not current_board_is_visited(next_board, visited) and \
-                        next_board not in moves_dict.keys():
-                    c = next_cost + moves_dict[current_board][2]
-                    moves_dict[next_board] = (current_board, next_move, c)
-                    item2 = PQItem((next_board, next_move, next_cost))
-                    fringe.push(item2, c + heuristic(next_board, problem))
+def bidirectional_search(problem, heuristic=None):
+    """
+    Breadth first search from both the start state and the set of goal states
+    (see get_goal_states) at once, always expanding a whole layer of the smaller
+    frontier, until the two searches meet. Returns a shortest solution. The
+    heuristic is ignored. A card with more than MAX_GOAL_STATES goal states
+    (e.g. a large board with many vehicles) is solved by a breadth first search
+    from the start state only.
+    """
+    start_state = problem.get_start_state()
+    if problem.is_goal_state(start_state) or problem.is_unsolvable():
+        return []
+    goal_states = get_goal_states(start_state, MAX_GOAL_STATES)
+    problem.stats.check()
+    if goal_states is None:
+        return breadth_first_search(problem)
+    # forward: state -> (previous state, move, distance from the start)
+    forward = {start_state: (None, None, 0)}
+    # backward: state -> (next state, move, distance to a goal)
+    backward = {goal_state: (None, None, 0) for goal_state in goal_states}
+    forward_frontier = [start_state]
+    backward_frontier = list(backward)
+    stats = problem.stats
+    while forward_frontier and backward_frontier:
+        stats.update_sizes(len(forward_frontier) + len(backward_frontier), len(forward) + len(backward))
+        best_meeting = None
+        if len(forward_frontier) <= len(backward_frontier):
+            next_frontier = []
+            for state in forward_frontier:
+                cost = forward[state][2] + 1
+                for next_state, next_move, next_cost in problem.get_successors(state):
+                    if next_state in forward:
+                        stats.duplicates += 1
+                        continue
+                    forward[next_state] = (state, next_move, cost)
+                    next_frontier.append(next_state)
+                    if next_state in backward and \
+                            (best_meeting is None or cost + backward[next_state][2] < best_meeting[1]):
+                        best_meeting = (next_state, cost + backward[next_state][2])
+            forward_frontier = next_frontier
+        else:
+            next_frontier = []
+            for state in backward_frontier:
+                cost = backward[state][2] + 1
+                # moves are reversible, so the predecessors of a state are its successors
+                for previous_state, move, previous_cost in problem.get_successors(state):
+                    if previous_state in backward:
+                        stats.duplicates += 1
+                        continue
+                    backward[previous_state] = (state, Move(move.vehicle_id, -move.wanted_move), cost)
+                    next_frontier.append(previous_state)
+                    if previous_state in forward and \
+                            (best_meeting is None or cost + forward[previous_state][2] < best_meeting[1]):
+                        best_meeting = (previous_state, cost + forward[previous_state][2])
+            backward_frontier = next_frontier
+        if best_meeting is not None:
+            return get_bidirectional_path(forward, backward, best_meeting[0])
     return []
 
 
-def ida_star(problem, heuristic=null_heuristic):
+def get_bidirectional_path(forward, backward, meeting_state):
     """
-    Iterative deepening A* heuristic. this function gets as an input a problem
-    and an heuristic and solved the problem. this function use a heuristic
-    function to evaluate the remaining cost to get to the goal from the A*
-    search algorithm.
+    generate an array of all the states and moves (as tuples) of the path that
+    goes through the meeting state of a bidirectional search.
     """
-    limit = heuristic(problem.get_start_state())
-    counter = 0
-    while counter < 100000000:
-        backtrace, limit, is_goal_state_flag = ida_star_helper(problem, heuristic, limit)
-        if is_goal_state_flag:
-            return backtrace
-        counter += 1
+    action_array = []
+    state = meeting_state
+    while forward[state][0] is not None:
+        previous_state, move = forward[state][:2]
+        action_array.append((previous_state, move))
+        state = previous_state
+    action_array.reverse()
+    state = meeting_state
+    while backward[state][0] is not None:
+        next_state, move = backward[state][:2]
+        action_array.append((state, move))
+        state = next_state
+    return action_array
 
 
-def ida_star_helper(problem, heuristic=null_heuristic, limit=0):
-    """
-    Search the node that has the lowest combined cost and heuristic first.
-    """
-    fringe = util.PriorityQueue()
-    moves_dict = {}
-    visited = set()
-    # fringe is the data structure with a board and the cost of the move.
-    item = PQItem((problem.get_start_state(), None, 0))
-    fringe.push(item, 0)
-    # moves dictionary is a dictionary for each board to its father and the cost of the action
-    moves_dict[problem.get_start_state()] = (None, None, 0)
-    new_limit = float('inf')
+def a_star_search(problem, heuristic=null_heuristic, batch=False, weight=1, cost_bound=None, budget=None):
+    """
+    Search the node that has the lowest combined cost and heuristic first, and
+    among those the deepest one.
+    If batch is True, the heuristic values of all the new successors of a node
+    are computed with a single vectorized call (see BatchHeuristics).
+    :param weight: the heuristic is multiplied by weight (weighted A*).
+    :param cost_bound: if given, nodes whose cost + heuristic is at least
+    cost_bound are pruned (e.g. the cost of a known solution).
+    :param budget: if given, budget.check(problem.stats) is called before every
+    expansion and may raise to stop the search (see AnytimeSearch).
+    """
+    if batch:
+        from BatchHeuristics import evaluate_batch
+    if problem.is_unsolvable():
+        return []
+    start_state = problem.get_start_state()
+    bitboard = start_state.bitboard
+    if is_small_integer_heuristic(heuristic):
+        fringe = util.BucketPriorityQueue(decrease_key=True)
+    else:
+        fringe = util.PriorityQueue()
+    # the nodes store is an array backed table of the generated states with their
+    # parent node, move, cost and heuristic value; the fringe holds node indices.
+    nodes = util.NodeStore(bitboard.wide_keys, bitboard.wide_occupancy)
+    stats = problem.stats
+    fringe.push(nodes.add(start_state.key, start_state.occupancy, -1, 0, 0, heuristic(start_state, problem)), 0)
+    open_size = 1
+    closed_size = 0
     while not fringe.is_empty():
-        current_board, current_move, current_cost = fringe.pop().data
-        is_goal_state_flag = problem.is_goal_state(current_board)
-        if is_goal_state_flag or current_cost > limit:
-            return get_path(moves_dict, current_board), new_limit, is_goal_state_flag
-        if not current_board_is_visited(current_board, visited):
-            visited.add(current_board)
-            current_board_successors = problem.get_successors(current_board)
-            for next_board, next_move, next_cost in current_board_successors:
-                if next_cost > limit and next_cost < new_limit:
-                    new_limit = next_cost
-                if not current_board_is_visited(next_board, visited) and next_board not in moves_dict.keys():
-                    c = next_cost + moves_dict[current_board][2]
-                    moves_dict[next_board] = (current_board, next_move, c)
-                    item2 = PQItem((next_board, next_move, next_cost))
-                    fringe.push(item2, c + heuristic(next_board, problem))
+        start = time.perf_counter()
+        node = fringe.pop()
+        stats.queue_time += time.perf_counter() - start
+        open_size -= 1
+        current_board = State(bitboard, nodes.keys[node], nodes.occupancies[node])
+        if problem.is_goal_state(current_board):
+            return get_node_path(nodes, bitboard, node)
+        if not nodes.closed[node]:
+            if budget is not None:
+                budget.check(stats)
+            nodes.closed[node] = 1
+            closed_size += 1
+            current_board_successors = []
+            for next_board, next_move, next_cost in problem.get_successors(current_board):
+                next_node = nodes.get_index(next_board.key)
+                if next_node is None:
+                    current_board_successors.append((next_board, next_move, next_cost))
+                    continue
+                stats.duplicates += 1
+                c = next_cost + nodes.costs[node]
+                if nodes.closed[next_node] or c >= nodes.costs[next_node] or \
+                        (cost_bound is not None and c + nodes.heuristics[next_node] >= cost_bound):
+                    continue
+                # a cheaper path to an open node: re-parent it and lower its priority
+                nodes.parents[next_node] = node
+                nodes.moves[next_node] = bitboard.get_move_code(bitboard.index[next_move.vehicle_id],
+                                                                next_move.wanted_move)
+                nodes.costs[next_node] = c
+                fringe.update(next_node, c + weight * nodes.heuristics[next_node], c)
+            start = time.perf_counter()
+            if batch:
+                next_hs = evaluate_batch(heuristic, [next_board for next_board, _, _ in current_board_successors],
+                                         problem)
+            else:
+                current_h = nodes.heuristics[node]
+                next_hs = [evaluate_successor(heuristic, current_h, current_board, next_move, next_board, problem)
+                           for next_board, next_move, _ in current_board_successors]
+            end = time.perf_counter()
+            stats.heuristic_time += end - start
+            for (next_board, next_move, next_cost), next_h in zip(current_board_successors, next_hs):
+                c = next_cost + nodes.costs[node]
+                if cost_bound is not None and c + next_h >= cost_bound:
+                    continue
+                move_code = bitboard.get_move_code(bitboard.index[next_move.vehicle_id], next_move.wanted_move)
+                fringe.push(nodes.add(next_board.key, next_board.occupancy, node, move_code, c, next_h),
+                            c + weight * next_h, c)
+                open_size += 1
+            stats.queue_time += time.perf_counter() - end
+            stats.update_sizes(open_size, closed_size)
     return []
 
 
+def ida_star(problem, heuristic=null_heuristic, table_size=IDA_TABLE_SIZE):
+    """
+    Iterative deepening A* heuristic. this function gets as an input a problem
+    and an heuristic and solved the problem. Every iteration is a depth first
+    search that cuts off the nodes whose f = cost + heuristic exceeds the limit.
+    The smallest f that was cut off, rounded up to an integer, is the exact next
+    limit; if the nodes cut off up to it are few compared to the nodes of the
+    iteration (a heuristic with fractional or very large values), the next limit
+    is raised to the smallest f that roughly doubles the iteration, the cost of
+    the nodes is then still bounded by the exact limit (so a deep path can't run
+    away), and a solution found above the exact limit is improved by carrying on
+    the iteration with a lower limit. The costs are integers, so no shorter
+    solution is skipped. Only the current path is kept in memory, plus a
+    transposition table of at most table_size states per iteration (pass
+    table_size=0 for memory linear in the solution depth, at the price of
+    re-expanding every transposition).
+    """
+    if problem.is_unsolvable():
+        return []
+    start_state = problem.get_start_state()
+    start_h = heuristic(start_state, problem)
+    exact_limit = limit = math.ceil(start_h)
+    while True:
+        problem.stats.ida_limits.append(limit)
+        expanded = problem.stats.expanded
+        table = {} if table_size > 0 else None
+        solution, cut_offs = ida_star_iteration(problem, heuristic, limit, exact_limit, start_state, start_h,
+                                                table, table_size)
+        if solution is not None:
+            return solution
+        if not cut_offs:
+            return []
+        exact_limit = min(cut_offs)
+        # raise the limit until the nodes cut off below it could double the iteration
+        nodes = 0
+        wanted = problem.stats.expanded - expanded
+        for f in sorted(cut_offs):
+            nodes += cut_offs[f]
+            if nodes >= wanted:
+                break
+        limit = max(limit, f)
+
+
+def ida_star_iteration(problem, heuristic, limit, exact_limit, start_state, start_h, table, table_size):
+    """
+    Depth first search of a single IDA* iteration from the start state. The
+    search is iterative, with an explicit stack of the successors left to try
+    of every state on the path, so its depth isn't bounded by the recursion limit.
+    The nodes whose cost is above exact_limit are cut off too. A solution whose f
+    is above exact_limit is kept, and the search goes on with a limit below its f
+    for a better one.
+    :param table: transposition table of the lowest cost each state was reached
+    with in this iteration, or None.
+    :return: a tuple of (the best solution found or None, the number of nodes cut
+    off for every rounded up f, or cost if the f is within the limit)
+    """
+    stats = problem.stats
+    cut_offs = {}
+    solution = None
+    # the (state, move) pairs from the start state to the current state
+    path = []
+    # the states on the path, used to prune cycles
+    on_path = {start_state}
+    # (state, cost, successors left to try) of every expanded state on the path
+    stack = []
+    state, cost, h, previous_move = start_state, 0, start_h, None
+    while True:
+        f = cost + h
+        if f > limit or cost > exact_limit:
+            key = math.ceil(f) if f > limit else cost
+            cut_offs[key] = cut_offs.get(key, 0) + 1
+        elif problem.is_goal_state(state):
+            solution = list(path)
+            if f <= exact_limit:
+                return solution, cut_offs
+            limit = math.ceil(f) - 1
+        elif table is not None and table.get(state, float('inf')) <= cost:
+            stats.duplicates += 1
+        else:
+            if table is not None and len(table) < table_size:
+                table[state] = cost
+            stats.update_sizes(len(path), len(table) if table is not None else 0)
+            successors = get_ida_successors(problem, heuristic, state, h, previous_move, on_path)
+            stack.append((state, cost, iter(successors)))
+            state = None
+        if state is not None and stack:
+            # the state is a leaf, leave it
+            on_path.remove(state)
+            path.pop()
+        successor = None
+        while stack:
+            parent, parent_cost, successors = stack[-1]
+            successor = next(successors, None)
+            if successor is not None:
+                break
+            stack.pop()
+            if stack:
+                on_path.remove(parent)
+                path.pop()
+        if successor is None:
+            return solution, cut_offs
+        h, state, previous_move, next_cost = successor
+        cost = parent_cost + next_cost
+        path.append((parent, previous_move))
+        on_path.add(state)
+
+
+def get_ida_successors(problem, heuristic, state, h, previous_move, on_path):
+    """
+    :param previous_move: the move that led to the state, its reverse is pruned.
+    :return: the (heuristic value, state, move, cost) of the successors of a state
+    that aren't on the path, the most promising first
+    """
+    stats = problem.stats
+    successors = []
+    for next_state, next_move, next_cost in problem.get_successors(state):
+        if previous_move is not None and next_move.vehicle_id == previous_move.vehicle_id and \
+                next_move.wanted_move == -previous_move.wanted_move:
+            continue
+        if next_state in on_path:
+            stats.duplicates += 1
+            continue
+        start = time.perf_counter()
+        next_h = evaluate_successor(heuristic, h, state, next_move, next_state, problem)
+        stats.heuristic_time += time.perf_counter() - start
+        successors.append((next_h, next_state, next_move, next_cost))
+    successors.sort(key=lambda successor: successor[0])
+    return successors
+
+
 # Abbreviations
 bfs = breadth_first_search
 dfs = depth_first_search
 astar = a_star_search
 ida = ida_star
+bibfs = bidirectional_search
@@ -0,0 +1,98 @@
+import time
+
+
+class SearchStats:
+    """
+    Statistics of a search, filled in by the search problem and the algorithms.
+
+    The SearchStats stores:
+    - expanded/generated: the number of expanded and generated nodes.
+    - duplicates: the number of generated nodes that were pruned because their
+      state was already reached (or, in IDA*, is on the current path or in the
+      transposition table).
+    - peak_open/peak_closed: the largest sizes of the open and closed lists (in
+      IDA*, the deepest path and the largest transposition table).
+    - move_generation_time/heuristic_time/queue_time: the seconds spent generating
+      successors, evaluating the heuristic and in fringe operations.
+    - ida_limits: the f limit of every IDA* iteration.
+
+    If a callback is given, it is called with the stats every interval expansions,
+    e.g. to report progress, and by check.
+    """
+
+    def __init__(self, callback=None, interval=10000):
+        self.expanded = 0
+        self.generated = 0
+        self.duplicates = 0
+        self.peak_open = 0
+        self.peak_closed = 0
+        self.move_generation_time = 0.0
+        self.heuristic_time = 0.0
+        self.queue_time = 0.0
+        self.ida_limits = []
+        self.start_time = time.perf_counter()
+        self.callback = callback
+        self.interval = interval
+
+    def add_expansion(self, generated, move_generation_time):
+        """
+        Count an expanded node with its number of successors and the time it took to
+        generate them, and call the callback if it's time to.
+        """
+        self.expanded += 1
+        self.generated += generated
+        self.move_generation_time += move_generation_time
+        if self.callback is not None and self.expanded % self.interval == 0:
+            self.callback(self)
+
+    def add_expansions(self, expanded, generated, move_generation_time=0.0):
+        """
+        Count several expansions at once (e.g. the ones made by other processes), and
+        call the callback if an interval boundary was crossed.
+        """
+        intervals = self.expanded // self.interval
+        self.expanded += expanded
+        self.generated += generated
+        self.move_generation_time += move_generation_time
+        if self.callback is not None and self.expanded // self.interval > intervals:
+            self.callback(self)
+
+    def check(self):
+        """
+        Call the callback now, e.g. after a phase of a search that expands no
+        nodes, so a callback that stops the search doesn't wait for the next
+        interval.
+        """
+        if self.callback is not None:
+            self.callback(self)
+
+    def update_sizes(self, open_size, closed_size):
+        if open_size > self.peak_open:
+            self.peak_open = open_size
+        if closed_size > self.peak_closed:
+            self.peak_closed = closed_size
+
+    def get_elapsed_time(self):
+        return time.perf_counter() - self.start_time
+
+    def get_nodes_per_second(self):
+        elapsed_time = self.get_elapsed_time()
+        return self.expanded / elapsed_time if elapsed_time > 0 else 0.0
+
+    def as_dict(self):
+        return {"expanded": self.expanded,
+                "generated": self.generated,
+                "duplicates": self.duplicates,
+                "peak_open": self.peak_open,
+                "peak_closed": self.peak_closed,
+                "move_generation_time": self.move_generation_time,
+                "heuristic_time": self.heuristic_time,
+                "queue_time": self.queue_time,
+                "ida_limits": list(self.ida_limits),
+                "elapsed_time": self.get_elapsed_time()}
+
+    def __str__(self):
+        return ("expanded %d, generated %d, duplicates %d, peak open %d, peak closed %d, "
+                "%.0f nodes/s, move generation %.3fs, heuristic %.3fs, queue %.3fs"
+                % (self.expanded, self.generated, self.duplicates, self.peak_open, self.peak_closed,
+                   self.get_nodes_per_second(), self.move_generation_time, self.heuristic_time, self.queue_time))
@@ -0,0 +1,140 @@
+import sqlite3
+import time
+from Board import Move
+
+# bump to invalidate the entries written by older versions of the solvers
+CACHE_FORMAT_VERSION = 2
+DEFAULT_MAX_ENTRIES = 1000000
+
+
+def get_card_signature(state):
+    """
+    :return: the canonical signature of the card of a state: the board size and
+    the static description (id, direction, size and lane) of every vehicle, sorted
+    by vehicle id, so the order of the lines in the card file doesn't matter
+    """
+    bitboard = state.bitboard
+    vehicles = sorted("%s%s%d/%d" % (bitboard.ids[i], bitboard.directions[i], bitboard.sizes[i], bitboard.lanes[i])
+                      for i in range(bitboard.num_of_vehicles))
+    return "%dx%d:%s" % (bitboard.board_w, bitboard.board_h, ",".join(vehicles))
+
+
+def get_canonical_key(state):
+    """
+    :return: the key of the state with its vehicles in the canonical (sorted id)
+    order, as a string
+    """
+    bitboard = state.bitboard
+    order = sorted(range(bitboard.num_of_vehicles), key=lambda i: bitboard.ids[i])
+    return ",".join(str(state.get_offset(i)) for i in order)
+
+
+def get_version(algorithm, heuristic):
+    """
+    :return: the version of the entries produced by an algorithm and heuristic
+    """
+    return "%d:%s/%s" % (CACHE_FORMAT_VERSION, getattr(algorithm, '__name__', str(algorithm)),
+                         getattr(heuristic, '__name__', str(heuristic)))
+
+
+class SolutionCache:
+    """
+    An on-disk (SQLite) cache of solutions. Every state on a stored solution is
+    saved with its remaining distance to the goal and its next move, so any later
+    query that lands on the path of a stored solution is answered without search.
+
+    Entries are keyed by canonical card signature, canonical state key and
+    version (the algorithm and heuristic that produced them). The cache keeps at
+    most max_entries entries and evicts the least recently used ones.
+    """
+
+    def __init__(self, path, max_entries=DEFAULT_MAX_ENTRIES):
+        self.connection = sqlite3.connect(path)
+        self.max_entries = max_entries
+        self.connection.execute("CREATE TABLE IF NOT EXISTS solutions ("
+                                "card TEXT NOT NULL, state TEXT NOT NULL, version TEXT NOT NULL, "
+                                "distance INTEGER NOT NULL, next_move TEXT, last_used REAL NOT NULL, "
+                                "PRIMARY KEY (card, state, version))")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS solutions_last_used ON solutions (last_used)")
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM solutions").fetchone()[0]
+
+    def store(self, solution, version, goal_state=None):
+        """
+        Store a solution: a list of (state, move) tuples. The goal state reached by
+        the solution is stored too (it is computed if not given).
+        """
+        if not solution and goal_state is None:
+            return
+        now = time.time()
+        card = get_card_signature(solution[0][0] if solution else goal_state)
+        rows = []
+        for i, (state, move) in enumerate(solution):
+            rows.append((card, get_canonical_key(state), version, len(solution) - i,
+                         "%s%+d" % (move.vehicle_id, move.wanted_move), now))
+        if goal_state is None:
+            goal_state = solution[-1][0].do_move(solution[-1][1])
+        rows.append((card, get_canonical_key(goal_state), version, 0, None, now))
+        # keep the shortest known distance of every state
+        self.connection.executemany("INSERT INTO solutions VALUES (?, ?, ?, ?, ?, ?) "
+                                    "ON CONFLICT (card, state, version) DO UPDATE SET "
+                                    "distance = excluded.distance, next_move = excluded.next_move, "
+                                    "last_used = excluded.last_used WHERE excluded.distance < solutions.distance",
+                                    rows)
+        self.evict()
+        self.connection.commit()
+
+    def evict(self):
+        """
+        Delete the least recently used entries above max_entries.
+        """
+        excess = len(self) - self.max_entries
+        if excess > 0:
+            self.connection.execute("DELETE FROM solutions WHERE rowid IN "
+                                    "(SELECT rowid FROM solutions ORDER BY last_used LIMIT ?)", (excess,))
+
+    def get_entry(self, state, version, card=None):
+        """
+        :param card: the card signature of the state, computed if not given
+        :return: the (distance, next move) of a state, or None if it is not cached
+        """
+        if card is None:
+            card = get_card_signature(state)
+        row = self.connection.execute("SELECT distance, next_move FROM solutions "
+                                      "WHERE card = ? AND state = ? AND version = ?",
+                                      (card, get_canonical_key(state), version)).fetchone()
+        if row is None:
+            return None
+        distance, next_move = row
+        if next_move is None:
+            return distance, None
+        return distance, Move(next_move[:-2], int(next_move[-2:]))
+
+    def lookup(self, state, version):
+        """
+        Answer a query from the cache, following the stored next moves.
+        :return: the solution of the state as a list of (state, move) tuples, or
+        None if the state is not cached
+        """
+        card = get_card_signature(state)
+        solution = []
+        used = []
+        entry = self.get_entry(state, version, card)
+        while entry is not None:
+            distance, move = entry
+            used.append((time.time(), card, get_canonical_key(state), version))
+            if distance == 0:
+                self.connection.executemany("UPDATE solutions SET last_used = ? "
+                                            "WHERE card = ? AND state = ? AND version = ?", used)
+                self.connection.commit()
+                return solution
+            solution.append((state, move))
+            state = state.do_move(move)
+            entry = self.get_entry(state, version, card)
+        # not cached, or a part of the path was evicted
+        return None
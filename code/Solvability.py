@@ -0,0 +1,103 @@
+"""
+Static unsolvability analysis: proves, without searching, that no goal state is
+reachable from a state.
+
+Vehicles that share a lane can never pass each other, and a cell that a vehicle
+covers in every reachable state (a fixed cell) is a wall for the vehicles of the
+crossing lanes. Starting with no fixed cells, every lane is split into segments
+by the walls of the crossing lanes, the range of offsets of every vehicle is
+bounded by packing the vehicles of its segment, in their order, against either
+end, and a vehicle covers the cells shared by its two extreme positions in every
+reachable state. New fixed cells make new walls, so this is repeated until no
+fixed cell is added.
+
+Every move is reversible, so all the states reachable from a state are
+reachable from each other: either the start state is proven unsolvable here, or
+no state the search can reach is a dead end, and there is nothing left to prune
+during the search.
+
+Malformed cards (vehicles out of the board or overlapping, a vertical X) are
+rejected before that: Bitboard, and so every RushHourSearch, raises a
+ValueError for them, and validate_card checks a card without building a search
+problem.
+"""
+from Bitboard import Bitboard
+from Vehicle import get_board_size
+
+
+def validate_card(vehicles_list):
+    """
+    Check that a card is well formed: its vehicles are on the board, don't
+    overlap and have distinct ids, and the player vehicle is horizontal. Raises a ValueError otherwise.
+    :return: the Bitboard of the card
+    """
+    return Bitboard(vehicles_list, *get_board_size(vehicles_list))
+
+
+def get_fixed_cells(state):
+    """
+    :return: for every vehicle, the mask of the cells it covers in every state
+    reachable from the given state
+    """
+    bitboard = state.bitboard
+    lanes = {}
+    for i in range(bitboard.num_of_vehicles):
+        lanes.setdefault((bitboard.directions[i], bitboard.lanes[i]), []).append(i)
+    for vehicles in lanes.values():
+        vehicles.sort(key=state.get_offset)
+    fixed = [0] * bitboard.num_of_vehicles
+    walls = {'H': 0, 'V': 0}
+    changed = True
+    while changed:
+        changed = False
+        for (direction, lane), vehicles in lanes.items():
+            if direction == 'H':
+                length = bitboard.board_w
+                cell = lambda offset: bitboard.cell(offset, lane)
+                crossing_walls = walls['V']
+            else:
+                length = bitboard.board_h
+                cell = lambda offset: bitboard.cell(lane, offset)
+                crossing_walls = walls['H']
+            # group the vehicles by the segment of the lane between walls they are in
+            segments = {}
+            for i in vehicles:
+                first = state.get_offset(i)
+                while first > 0 and not crossing_walls & cell(first - 1):
+                    first -= 1
+                segments.setdefault(first, []).append(i)
+            for first, in_segment in segments.items():
+                last = state.get_offset(in_segment[-1]) + bitboard.sizes[in_segment[-1]] - 1
+                while last < length - 1 and not crossing_walls & cell(last + 1):
+                    last += 1
+                min_offset = first
+                max_offset = last + 1 - sum(bitboard.sizes[i] for i in in_segment)
+                for i in in_segment:
+                    mask = bitboard.cell_masks[i][min_offset] & bitboard.cell_masks[i][max_offset]
+                    if mask != fixed[i]:
+                        fixed[i] = mask
+                        walls[direction] |= mask
+                        changed = True
+                    min_offset += bitboard.sizes[i]
+                    max_offset += bitboard.sizes[i]
+    return fixed
+
+
+def get_unsolvability_reason(state):
+    """
+    :return: why no goal state is reachable from the given state, or None if it
+    can't be proven
+    """
+    bitboard = state.bitboard
+    if bitboard.player is None:
+        return "the card has no player vehicle X"
+    player_offset = state.get_player_offset()
+    for i in range(bitboard.num_of_vehicles):
+        if i != bitboard.player and bitboard.directions[i] == 'H' and bitboard.lanes[i] == bitboard.exit_row \
+                and state.get_offset(i) > player_offset:
+            return "vehicle %s is in front of X in its row and can never leave it" % bitboard.ids[i]
+    exit_mask = bitboard.exit_masks[player_offset]
+    for i, mask in enumerate(get_fixed_cells(state)):
+        if mask & exit_mask:
+            return "vehicle %s can never clear the path of X to the exit" % bitboard.ids[i]
+    return None
@@ -0,0 +1,293 @@
+import argparse
+import itertools
+import json
+import multiprocessing
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, CancelledError
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from BatchSolver import SolveTimeout, get_algorithm, get_heuristic
+from CardCorpus import parse_card
+from Game import get_move_direction
+from RushHourSearch import RushHourSearch
+from SearchStats import SearchStats
+from Solvability import validate_card
+
+"""
+A long running local solver service: an HTTP server that queues solve requests
+onto a pool of warm worker processes.
+
+POST /solve with a json body {"card": "<the lines of a card file>",
+"algorithm": "astar", "heuristic": "blocking", "timeout": 10, "wait": true}
+(everything but the card is optional). With "wait" the response is the result,
+otherwise it is {"id": <request id>, "status": "queued"} and the result is
+polled with GET /solve/<id>. DELETE /solve/<id> cancels a request, queued or
+running. A result looks like {"id": 1, "status": "solved", "moves": [{"vehicle":
+"A", "move": 1, "direction": "Right"}, ...], "length": 28, "expanded": 7344,
+"time": 0.12}; the status is one of queued, solved, unsolved, unsolvable (proven
+without search, with the "reason"), timeout, cancelled or error.
+
+A running search checks its deadline and cancellation every CHECK_INTERVAL
+expansions and after its phases that expand no nodes (e.g. the goal enumeration
+of bibfs or the building of a pattern database), so it may overrun its timeout
+by that much. If a worker process dies, its request gets a 503 error and the
+pool is restarted.
+"""
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_TIMEOUT = 60
+# the running searches check their deadline and cancellation every this many
+# expansions
+CHECK_INTERVAL = 1000
+# the number of the last cancelled request ids the workers see
+CANCELLED_SLOTS = 256
+# the number of finished results kept for GET /solve/<id>
+MAX_RESULTS = 10000
+
+# the ids of the cancelled requests, shared with the workers
+cancelled_requests = None
+
+
+class SolveCancelled(Exception):
+    pass
+
+
+def init_worker(cancelled):
+    global cancelled_requests
+    cancelled_requests = cancelled
+
+
+def check_request(request_id, deadline):
+    """
+    Raise SolveCancelled if the request was cancelled and SolveTimeout if its
+    deadline passed.
+    """
+    if request_id in cancelled_requests[:]:
+        raise SolveCancelled()
+    if time.time() > deadline:
+        raise SolveTimeout()
+
+
+def solve_request(request_id, vehicles_list, algorithm_name, heuristic_name, deadline):
+    """
+    Solve a request in a worker process. The search checks the deadline and the
+    cancellation through a SearchStats callback.
+    :return: the result dictionary
+    """
+    result = {"id": request_id}
+    start = time.time()
+    try:
+        check_request(request_id, deadline)
+        stats = SearchStats(lambda stats: check_request(request_id, deadline), CHECK_INTERVAL)
+        rushHour = RushHourSearch(vehicles_list, stats)
+        backtrace = get_algorithm(algorithm_name)(rushHour, get_heuristic(heuristic_name))
+        solved = backtrace or rushHour.is_goal_state(rushHour.get_start_state())
+        result["status"] = "solved" if solved else "unsolvable" if rushHour.is_unsolvable() else "unsolved"
+        if rushHour.is_unsolvable():
+            result["reason"] = rushHour.unsolvable_reason
+        result["moves"] = [{"vehicle": move.vehicle_id, "move": move.wanted_move,
+                            "direction": get_move_direction(move, vehicles_list)} for _, move in backtrace]
+        result["length"] = len(backtrace)
+        result["expanded"] = rushHour.expanded
+    except SolveTimeout:
+        result["status"] = "timeout"
+    except SolveCancelled:
+        result["status"] = "cancelled"
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = repr(e)
+    result["time"] = time.time() - start
+    return result
+
+
+class SolverService:
+    """
+    Queues solve requests onto a pool of worker processes and keeps their
+    futures, so they can be waited for, polled and cancelled.
+    """
+
+    def __init__(self, processes=None, default_timeout=DEFAULT_TIMEOUT):
+        self.cancelled = multiprocessing.Array('q', CANCELLED_SLOTS)
+        self.cancelled_count = 0
+        self.processes = processes
+        self.pool = self.create_pool()
+        self.default_timeout = default_timeout
+        self.ids = itertools.count(1)
+        # request id -> (future, the pool it runs on)
+        self.futures = OrderedDict()
+        self.lock = threading.Lock()
+
+    def create_pool(self):
+        return ProcessPoolExecutor(self.processes, initializer=init_worker, initargs=(self.cancelled,))
+
+    def restart_pool(self, pool):
+        """
+        Replace a broken pool (one of its worker processes died) with a new one,
+        unless that was already done.
+        """
+        with self.lock:
+            if self.pool is pool:
+                self.pool = self.create_pool()
+                pool.shutdown(wait=False)
+
+    def submit(self, card, algorithm_name="astar", heuristic_name="blocking", timeout=None):
+        """
+        Queue a solve request. A broken pool is restarted once.
+        :param card: the text of a card file
+        :return: the request id
+        """
+        vehicles_list = parse_card(card.splitlines())
+        if not vehicles_list:
+            raise ValueError("empty card")
+        validate_card(vehicles_list)
+        get_algorithm(algorithm_name)
+        get_heuristic(heuristic_name)
+        deadline = time.time() + (timeout if timeout is not None else self.default_timeout)
+        request_id = next(self.ids)
+        pool = self.pool
+        try:
+            future = pool.submit(solve_request, request_id, vehicles_list, algorithm_name, heuristic_name, deadline)
+        except BrokenProcessPool:
+            self.restart_pool(pool)
+            pool = self.pool
+            future = pool.submit(solve_request, request_id, vehicles_list, algorithm_name, heuristic_name, deadline)
+        with self.lock:
+            self.futures[request_id] = (future, pool)
+            while len(self.futures) > MAX_RESULTS:
+                self.futures.popitem(last=False)
+        return request_id
+
+    def get_result(self, request_id, wait=False):
+        """
+        :return: the result of a request, a queued status if it isn't done and wait
+        is False, or None for an unknown request
+        :raise BrokenProcessPool: if a worker process died before the request was
+        done (the pool is then restarted)
+        """
+        future, pool = self.futures.get(request_id, (None, None))
+        if future is None:
+            return None
+        if not wait and not future.done():
+            return {"id": request_id, "status": "queued"}
+        try:
+            return future.result()
+        except CancelledError:
+            return {"id": request_id, "status": "cancelled"}
+        except BrokenProcessPool:
+            self.restart_pool(pool)
+            raise
+
+    def cancel(self, request_id):
+        """
+        Cancel a request: a queued request is dropped, a running one stops at its
+        next check.
+        :return: False for an unknown request
+        """
+        future, _ = self.futures.get(request_id, (None, None))
+        if future is None:
+            return False
+        if not future.cancel():
+            with self.cancelled.get_lock():
+                self.cancelled[self.cancelled_count % CANCELLED_SLOTS] = request_id
+                self.cancelled_count += 1
+        return True
+
+    def shutdown(self):
+        self.pool.shutdown(cancel_futures=True)
+
+
+class SolverRequestHandler(BaseHTTPRequestHandler):
+
+    def send_json(self, code, body):
+        data = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def get_request_id(self):
+        """
+        :return: the id of a /solve/<id> path, or None
+        """
+        prefix = "/solve/"
+        if self.path.startswith(prefix) and self.path[len(prefix):].isdigit():
+            return int(self.path[len(prefix):])
+        return None
+
+    def do_POST(self):
+        if self.path != "/solve":
+            self.send_json(404, {"error": "unknown path"})
+            return
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            request_id = self.server.service.submit(body["card"], body.get("algorithm", "astar"),
+                                                    body.get("heuristic", "blocking"), body.get("timeout"))
+        except (ValueError, KeyError, TypeError) as e:
+            self.send_json(400, {"error": "bad request: " + repr(e)})
+            return
+        except BrokenProcessPool:
+            self.send_json(503, {"error": "the worker pool is unavailable, retry"})
+            return
+        if body.get("wait", True):
+            self.send_result(request_id, wait=True)
+        else:
+            self.send_json(202, {"id": request_id, "status": "queued"})
+
+    def send_result(self, request_id, wait=False):
+        try:
+            result = self.server.service.get_result(request_id, wait)
+        except BrokenProcessPool:
+            self.send_json(503, {"id": request_id, "status": "error",
+                                 "error": "the worker process of the request died, the pool was restarted"})
+            return
+        if result is None:
+            self.send_json(404, {"error": "unknown request"})
+        else:
+            self.send_json(200, result)
+
+    def do_GET(self):
+        request_id = self.get_request_id()
+        if request_id is None:
+            self.send_json(404, {"error": "unknown request"})
+        else:
+            self.send_result(request_id)
+
+    def do_DELETE(self):
+        request_id = self.get_request_id()
+        if request_id is None or not self.server.service.cancel(request_id):
+            self.send_json(404, {"error": "unknown request"})
+        else:
+            self.send_json(200, {"id": request_id, "status": "cancelling"})
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, processes=None, default_timeout=DEFAULT_TIMEOUT):
+    service = SolverService(processes, default_timeout)
+    server = ThreadingHTTPServer((host, port), SolverRequestHandler)
+    server.service = service
+    print("serving on http://%s:%d" % (host, server.server_address[1]))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve solve requests over HTTP from a pool of worker processes.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("-p", "--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="number of worker processes (default: all cores)")
+    parser.add_argument("-t", "--timeout", type=float, default=DEFAULT_TIMEOUT,
+                        help="default time limit of a request in seconds, from the moment it is queued")
+    args = parser.parse_args(argv)
+    serve(args.host, args.port, args.jobs, args.timeout)
+
+
+if __name__ == '__main__':
+    main()
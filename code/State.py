@@ -0,0 +1,129 @@
+from Vehicle import Vehicle, Card
+from Board import Board, Move
+
+
+class State:
+    """
+    An immutable search state of a card.
+
+    The State stores:
+    - bitboard: the static tables of the card (vehicle ids, sizes, directions and
+      masks), shared by every state of the card.
+    - key: the packed offsets of all the vehicles (see Bitboard).
+    - occupancy: the occupancy mask of the state.
+
+    A successor state shares the bitboard of its parent and only differs by its
+    key and occupancy, so no vehicle or grid is copied during the search. Use
+    get_board to get a Board view of the state (e.g. for printing).
+    """
+    __slots__ = ('bitboard', 'key', 'occupancy')
+
+    def __init__(self, bitboard, key, occupancy):
+        self.bitboard = bitboard
+        self.key = key
+        self.occupancy = occupancy
+
+    @staticmethod
+    def from_board(board):
+        """
+        :return: the state of the given board
+        """
+        return State(board.bitboard, board.get_key(), board.occupancy)
+
+    def get_key(self):
+        return self.key
+
+    def get_offset(self, i):
+        """
+        :return: the offset of the i'th vehicle along its moving axis
+        """
+        return (self.key >> self.bitboard.shifts[i]) & self.bitboard.offset_mask
+
+    def get_player_offset(self):
+        """
+        :return: the x coordinate of the player vehicle
+        """
+        return self.get_offset(self.bitboard.player)
+
+    def get_vehicle_at(self, x, y):
+        """
+        :return: the index of the vehicle in the y'th row and x'th column, or None if
+        the tile is free
+        """
+        return self.bitboard.get_vehicle_at(self.key, x, y)
+
+    def check_tile_legal(self, x, y):
+        """
+        Check if the tile in the y'th row and x'th column is free.
+        """
+        return not self.occupancy & self.bitboard.cell(x, y)
+
+    def is_goal(self):
+        """
+        :return: True if and only if the path of the player vehicle to the exit is free
+        """
+        return not self.occupancy & self.bitboard.exit_masks[self.get_player_offset()]
+
+    def get_legal_moves(self):
+        """
+        Returns a list of legal moves for the current state.
+        """
+        ids = self.bitboard.ids
+        return [Move(ids[i], wanted_move) for i, wanted_move in self.bitboard.get_legal_moves(self.key, self.occupancy)]
+
+    def get_successors(self):
+        """
+        :return: a list of (successor, move) pairs for all the legal moves of the state
+        """
+        bitboard = self.bitboard
+        key = self.key
+        occupancy = self.occupancy
+        ids = bitboard.ids
+        successors = []
+        for i, wanted_move in bitboard.get_legal_moves(key, occupancy):
+            next_key, next_occupancy = bitboard.apply_move(key, occupancy, i, wanted_move)
+            successors.append((State(bitboard, next_key, next_occupancy), Move(ids[i], wanted_move)))
+        return successors
+
+    def do_move(self, move):
+        """
+        Performs a move, returning a new state. If the move is not legal, a
+        ValueError is raised.
+        """
+        i = self.bitboard.index.get(move.vehicle_id)
+        if i is None or not self.bitboard.check_move_valid(self.key, self.occupancy, i, move.wanted_move):
+            raise ValueError("Move is invalid")
+        key, occupancy = self.bitboard.apply_move(self.key, self.occupancy, i, move.wanted_move)
+        return State(self.bitboard, key, occupancy)
+
+    def get_vehicles_list(self):
+        """
+        :return: a new Card of Vehicle objects placed according to the state
+        """
+        bitboard = self.bitboard
+        vehicles_list = Card(board_w=bitboard.board_w, board_h=bitboard.board_h)
+        for i, vehicle_id in enumerate(bitboard.ids):
+            offset = self.get_offset(i)
+            # Vehicle takes the row before the column
+            if bitboard.directions[i] == 'H':
+                vehicles_list.append(Vehicle(vehicle_id, bitboard.lanes[i], offset, 'H', bitboard.sizes[i]))
+            else:
+                vehicles_list.append(Vehicle(vehicle_id, offset, bitboard.lanes[i], 'V', bitboard.sizes[i]))
+        return vehicles_list
+
+    def get_board(self):
+        """
+        :return: a Board view of the state
+        """
+        return Board(self.get_vehicles_list(), self.bitboard)
+
+    def print_board(self):
+        self.get_board().print_board()
+
+    def __eq__(self, other):
+        if not isinstance(other, State):
+            return NotImplemented
+        return self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
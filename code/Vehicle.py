@@ -1,6 +1,8 @@
 
 available_vehicles = {'X': 2, 'A': 2, 'B': 2, 'C': 2, 'D': 2, 'E': 2, 'F': 2, 'G': 2, 'H': 2, 'I': 2,
                       'J': 2, 'K': 2, 'O': 3, 'P': 3, 'Q': 3, 'R': 3}
+# the width and height of the board of the cards that don't declare a size
+DEFAULT_BOARD_SIZE = 6
 
 
 class Vehicle:
@@ -9,14 +11,14 @@ class Vehicle:
     a horizontal vehicle and to the top most coordinate if it is a vertical vehicle.
     The direction is 'H' if the vehicle is horizontal and 'V' if it is vertical.
     All vehicles X,A,B,C,D,E,F,G,I,J,K are cars and their size is 2, while O,P,Q,R are trucks
-    and their size is 3.
+    and their size is 3. Other ids (or other sizes) need an explicit size.
     """
-    def __init__(self, id, x, y, direction):
+    def __init__(self, id, x, y, direction, size=None):
         self.id = id
         self.x = y
         self.y = x
         self.direction = direction
-        self.size = available_vehicles[id]
+        self.size = size if size is not None else available_vehicles[id]
 
     def get_id(self):
         return self.id
@@ -50,3 +52,21 @@ class Vehicle:
 
     def set_y_coordinate(self, new_y):
         self.y = new_y
+
+
+class Card(list):
+    """
+    The vehicles list of a card, with the width and height of its board.
+    """
+    def __init__(self, vehicles=(), board_w=DEFAULT_BOARD_SIZE, board_h=DEFAULT_BOARD_SIZE):
+        list.__init__(self, vehicles)
+        self.board_w = board_w
+        self.board_h = board_h
+
+
+def get_board_size(vehicles_list):
+    """
+    :return: the (width, height) of the board of a vehicles list, the default
+    size unless it is a Card
+    """
+    return getattr(vehicles_list, 'board_w', DEFAULT_BOARD_SIZE), getattr(vehicles_list, 'board_h', DEFAULT_BOARD_SIZE)
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# the modules of the program are imported by name from the code folder
+CODE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, CODE_DIR)
+CARDS_DIR = os.path.join(CODE_DIR, "cards")
@@ -0,0 +1,35 @@
+import json
+import os
+from conftest import CARDS_DIR
+from BatchSolver import main
+
+
+def test_bad_card_does_not_stop_the_batch(tmp_path, capsys):
+    corpus = tmp_path / "cards"
+    corpus.mkdir()
+    # the bad card has a vehicle out of the board, it sorts before the good ones
+    (corpus / "a_bad").write_text("X21H\nA26V\n")
+    for name in ("easy1", "hard1"):
+        with open(os.path.join(CARDS_DIR, name)) as file:
+            (corpus / name).write_text(file.read())
+    main([str(corpus), "-j", "1", "-f", "jsonl"])
+    rows = {row["card"]: row for row in map(json.loads, capsys.readouterr().out.splitlines())}
+    assert rows["a_bad"]["status"] == "error"
+    assert "out of the board" in rows["a_bad"]["error"]
+    assert rows["easy1"]["status"] == "solved"
+    assert rows["hard1"]["status"] == "solved"
+
+
+def test_malformed_card_does_not_stop_the_batch(tmp_path, capsys):
+    corpus = tmp_path / "cards"
+    corpus.mkdir()
+    # an unknown vehicle id without a size, and a line that is too short
+    (corpus / "a_unknown").write_text("X21H\nZ03V\n")
+    (corpus / "b_short").write_text("X20H\nQ2\n")
+    with open(os.path.join(CARDS_DIR, "easy1")) as file:
+        (corpus / "easy1").write_text(file.read())
+    main([str(corpus), "-j", "1", "-f", "jsonl"])
+    rows = {row["card"]: row for row in map(json.loads, capsys.readouterr().out.splitlines())}
+    assert rows["a_unknown"]["status"] == "error"
+    assert rows["b_short"]["status"] == "error"
+    assert rows["easy1"]["status"] == "solved"
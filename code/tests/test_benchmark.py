@@ -0,0 +1,39 @@
+import os
+import pytest
+from conftest import CARDS_DIR
+import Benchmark
+from Benchmark import benchmark, benchmark_in_process, compare, main
+
+
+def failing_search(problem, heuristic):
+    raise RecursionError("maximum recursion depth exceeded")
+
+
+def test_failing_combination_is_a_row(monkeypatch):
+    monkeypatch.setitem(Benchmark.ALGORITHM_NAMES, "failing", failing_search)
+    path = os.path.join(CARDS_DIR, "easy1")
+    failed = benchmark(path, "failing", "blocking", warmup=1, repeats=1)
+    assert failed["status"] == "error"
+    assert "RecursionError" in failed["error"]
+    solved = benchmark(path, "astar", "blocking", warmup=1, repeats=1)
+    assert solved["status"] == "solved"
+    baseline = {"results": {"easy1/astar/blocking": solved}}
+    assert compare(baseline, {"results": {"easy1/astar/blocking": failed}}) == \
+        ["easy1/astar/blocking: failed with " + failed["error"]]
+    assert compare(baseline, baseline) == []
+
+
+def test_peak_rss_is_measured_per_combination():
+    path = os.path.join(CARDS_DIR, "easy1")
+    result = benchmark_in_process(path, "astar", "blocking", warmup=1, repeats=1)
+    assert result["status"] == "solved"
+    assert result["peak_rss"] > 0
+    baseline = {"results": {"easy1/astar/blocking": result}}
+    grown = dict(result, peak_rss=2 * result["peak_rss"])
+    assert compare(baseline, {"results": {"easy1/astar/blocking": grown}}) == \
+        ["easy1/astar/blocking: peak_rss %.6g -> %.6g (+100.0%%)" % (result["peak_rss"], grown["peak_rss"])]
+
+
+def test_repeats_must_be_positive():
+    with pytest.raises(SystemExit):
+        main(["-r", "0", os.path.join(CARDS_DIR, "easy1")])
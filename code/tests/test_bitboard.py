@@ -0,0 +1,37 @@
+import os
+import pytest
+from conftest import CARDS_DIR
+from Bitboard import Bitboard
+from CardCorpus import parse_card
+from Game import EASY, INVALID_CARDS, get_game_file, parse_file
+
+
+def test_overlapping_vehicles():
+    with pytest.raises(ValueError, match="overlaps"):
+        Bitboard(parse_card(["X21H", "A12V"]))
+
+
+def test_vehicle_out_of_the_board():
+    with pytest.raises(ValueError, match="out of the board"):
+        Bitboard(parse_card(["X21H", "A05H"]))
+
+
+@pytest.mark.parametrize("name", sorted(INVALID_CARDS))
+def test_overlapping_bundled_cards(name):
+    with pytest.raises(ValueError, match="overlaps"):
+        Bitboard(parse_file(os.path.join(CARDS_DIR, name)))
+
+
+def test_invalid_cards_are_never_picked():
+    assert not {get_game_file(EASY) for _ in range(200)} & INVALID_CARDS
+
+
+@pytest.mark.parametrize("line", ["Q2", "Z03V", "AB 0 3 V 2", "X20Y", "X 2 0 H 0", "size 8"])
+def test_malformed_line(line):
+    with pytest.raises(ValueError, match="line 2 of the card"):
+        parse_card(["X20H", line])
+
+
+def test_valid_card():
+    bitboard = Bitboard(parse_card(["X21H", "A02V", "B54H"]))
+    assert bitboard.num_of_vehicles == 3
@@ -0,0 +1,63 @@
+import os
+import pytest
+from conftest import CARDS_DIR
+from CardCorpus import CardCorpus, decode_card, encode_card, parse_card, read_cards, write_corpus
+from Game import parse_file
+from RushHourSearch import RushHourSearch, breadth_first_search
+from test_search import CARDS, get_optimal_length
+
+
+def get_description(vehicles_list):
+    return (vehicles_list.board_w, vehicles_list.board_h,
+            [(vehicle.get_id(), vehicle.get_x_coordinate(), vehicle.get_y_coordinate(), vehicle.get_direction(),
+              vehicle.get_size()) for vehicle in vehicles_list])
+
+
+@pytest.mark.parametrize("name", CARDS)
+def test_encode_decode_round_trip(name):
+    vehicles_list = parse_file(os.path.join(CARDS_DIR, name))
+    assert get_description(decode_card(encode_card(vehicles_list))) == get_description(vehicles_list)
+
+
+def test_encode_decode_large_board():
+    vehicles_list = parse_card(["size 9 9", "X 4 0 H", "A 3 3 V", "B 4 5 V", "Z 2 8 V 5"])
+    assert get_description(decode_card(encode_card(vehicles_list))) == get_description(vehicles_list)
+
+
+def test_zip_archive_holds_the_bundled_cards():
+    cards = dict(read_cards([os.path.join(CARDS_DIR, "cards.zip")], keep_errors=True))
+    for name in CARDS:
+        assert get_description(cards[name]) == get_description(parse_file(os.path.join(CARDS_DIR, name)))
+
+
+def test_corpus_round_trip(tmp_path):
+    path = str(tmp_path / "cards.corpus")
+    cards = [(name, parse_file(os.path.join(CARDS_DIR, name))) for name in CARDS]
+    assert write_corpus(path, cards) == len(cards)
+    corpus = CardCorpus(path)
+    try:
+        assert len(corpus) == len(cards)
+        assert [(name, get_description(vehicles_list)) for name, vehicles_list in corpus] == \
+            [(name, get_description(vehicles_list)) for name, vehicles_list in cards]
+        name = CARDS[-1]
+        solution = breadth_first_search(RushHourSearch(corpus.get_card(name)))
+        assert len(solution) == get_optimal_length(name)
+        with pytest.raises(IndexError):
+            corpus.get_record(len(cards))
+    finally:
+        corpus.close()
+    assert [name for name, _ in read_cards([path])] == CARDS
+
+
+def test_empty_corpus(tmp_path):
+    path = str(tmp_path / "empty.corpus")
+    assert write_corpus(path, []) == 0
+    assert list(read_cards([path])) == []
+
+
+def test_not_a_corpus(tmp_path):
+    path = tmp_path / "card.corpus"
+    path.write_bytes(b"X 2 0 H\n" * 4)
+    (tmp_path / "card.corpus.index").write_text("")
+    with pytest.raises(ValueError):
+        CardCorpus(str(path))
@@ -0,0 +1,25 @@
+import os
+import numpy as np
+import pytest
+from conftest import CARDS_DIR
+from DistanceTable import DistanceTable, UNSOLVABLE, to_distances
+from Game import parse_file
+from RushHourSearch import RushHourSearch, breadth_first_search
+
+
+@pytest.mark.parametrize("name", ["easy1", "medium1"])
+def test_saved_table_solves_the_card(name, tmp_path):
+    problem = RushHourSearch(parse_file(os.path.join(CARDS_DIR, name)))
+    start_state = problem.get_start_state()
+    DistanceTable.build(start_state).save(str(tmp_path / name))
+    table = DistanceTable.load(str(tmp_path / name), start_state.bitboard)
+    optimal_length = len(breadth_first_search(RushHourSearch(parse_file(os.path.join(CARDS_DIR, name)))))
+    assert table.get_distance(start_state) == optimal_length
+    assert len(table.solve(start_state)) == optimal_length
+
+
+def test_long_distances_are_not_wrapped():
+    distances = to_distances(np.array([0, 300, -1], dtype=np.int64))
+    assert distances.tolist() == [0, 300, UNSOLVABLE]
+    with pytest.raises(ValueError):
+        to_distances(np.array([0, UNSOLVABLE], dtype=np.int64))
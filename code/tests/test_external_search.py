@@ -0,0 +1,71 @@
+import os
+import pytest
+from conftest import CARDS_DIR
+from CardCorpus import parse_card
+from ExternalSearch import ExternalBFS, Layer, external_bfs
+from Game import parse_file
+from LayeredBFS import get_component
+from RushHourSearch import RushHourSearch, breadth_first_search
+
+# small enough that the layers of the cards have many buckets
+RAM_BUDGET = 2 ** 12
+
+
+@pytest.mark.parametrize("name", ["easy1", "medium1", "hard1"])
+def test_external_bfs_is_optimal(name, tmp_path):
+    path = os.path.join(CARDS_DIR, name)
+    optimal_length = len(breadth_first_search(RushHourSearch(parse_file(path))))
+    solution = external_bfs(RushHourSearch(parse_file(path)), directory=str(tmp_path), ram_budget=RAM_BUDGET)
+    assert len(solution) == optimal_length
+    # the layer files are deleted from the given directory
+    assert os.listdir(tmp_path) == []
+
+
+def test_external_bfs_on_a_large_board(tmp_path, monkeypatch):
+    # the occupancy masks of a 9x9 board don't fit in 64 bits
+    card = parse_card(["size 9 9", "X 4 0 H", "A 3 3 V", "B 4 5 V", "C 6 4 H", "Z 2 8 V 4"])
+    writes = []
+    write = Layer.write
+
+    def counting_write(layer, bucket, records):
+        writes.append(bucket)
+        return write(layer, bucket, records)
+    monkeypatch.setattr(Layer, "write", counting_write)
+    problem = RushHourSearch(card)
+    solution = external_bfs(problem, directory=str(tmp_path), ram_budget=RAM_BUDGET)
+    assert len(solution) == len(breadth_first_search(RushHourSearch(card)))
+    assert writes
+    state = problem.get_start_state()
+    for previous_state, move in solution:
+        assert previous_state == state
+        state = state.do_move(move)
+    assert state.is_goal()
+
+
+def test_layers_that_fit_in_ram_are_not_written(tmp_path, monkeypatch):
+    monkeypatch.setattr(Layer, "write", lambda layer, bucket, records: pytest.fail("a layer was written"))
+    path = os.path.join(CARDS_DIR, "medium1")
+    solution = external_bfs(RushHourSearch(parse_file(path)), directory=str(tmp_path))
+    assert len(solution) == len(breadth_first_search(RushHourSearch(parse_file(path))))
+    assert os.listdir(tmp_path) == []
+
+
+def test_buckets_are_loaded_a_bounded_number_of_times(monkeypatch):
+    start_state = RushHourSearch(parse_file(os.path.join(CARDS_DIR, "hard1"))).get_start_state()
+    loads = []
+    load = Layer.load
+
+    def counting_load(layer, bucket):
+        loads.append((layer.depth, bucket))
+        return load(layer, bucket)
+    monkeypatch.setattr(Layer, "load", counting_load)
+    search = ExternalBFS(start_state, ram_budget=RAM_BUDGET)
+    try:
+        while search.expand() is not None:
+            pass
+        assert sum(layer.size for layer in search.layers) == len(get_component(start_state)[0])
+        # every layer is loaded once to be expanded, and the deduplication of a
+        # bucket loads only the matching buckets of the previous two layers
+        assert len(loads) <= 5 * sum(layer.num_of_buckets for layer in search.layers) + 5
+    finally:
+        search.close()
@@ -0,0 +1,19 @@
+import io
+import os
+import pytest
+from conftest import CARDS_DIR
+from Game import main
+
+
+@pytest.mark.parametrize("card", ["X20H\nQ2\n", "X20H\nZ03V\n", "X21H\nA12V\n"])
+def test_invalid_card_exits_with_status_2(card, monkeypatch, capsys):
+    monkeypatch.setattr("sys.stdin", io.StringIO(card))
+    with pytest.raises(SystemExit) as exit_info:
+        main(["-"])
+    assert exit_info.value.code == 2
+    assert capsys.readouterr().err.startswith("invalid card: ")
+
+
+def test_solves_a_card(capsys):
+    assert main([os.path.join(CARDS_DIR, "easy1")]) == 0
+    assert len(capsys.readouterr().out.splitlines()) == 13
@@ -0,0 +1,47 @@
+import os
+import numpy as np
+import pytest
+from conftest import CARDS_DIR
+from CardCorpus import parse_card
+from Game import parse_file
+from LayeredBFS import get_component, get_goal_distances, layered_bfs
+from RushHourSearch import RushHourSearch, breadth_first_search
+from test_search import CARDS, get_optimal_length
+
+
+@pytest.mark.parametrize("name", CARDS)
+def test_layered_bfs_is_optimal(name):
+    problem = RushHourSearch(parse_file(os.path.join(CARDS_DIR, name)))
+    solution = layered_bfs(problem)
+    assert len(solution) == get_optimal_length(name)
+    state = problem.get_start_state()
+    for previous_state, move in solution:
+        assert previous_state == state
+        state = state.do_move(move)
+    assert problem.is_goal_state(state)
+
+
+@pytest.mark.parametrize("name", ["easy1", "medium1"])
+def test_component_and_goal_distances(name):
+    start_state = RushHourSearch(parse_file(os.path.join(CARDS_DIR, name))).get_start_state()
+    seen = {start_state.key}
+    frontier = [start_state]
+    while frontier:
+        frontier = [successor for state in frontier for successor, _ in state.get_successors()
+                    if successor.key not in seen and not seen.add(successor.key)]
+    keys, occupancies = get_component(start_state)
+    assert keys.tolist() == sorted(seen)
+    distances = get_goal_distances(start_state.bitboard, keys, occupancies, -1)
+    assert distances[np.searchsorted(keys, start_state.key)] == get_optimal_length(name)
+
+
+def test_layered_bfs_on_a_large_board():
+    # the occupancy masks of a 9x9 board don't fit in 64 bits
+    card = parse_card(["size 9 9", "X 4 0 H", "A 3 3 V", "B 4 5 V", "C 6 4 H", "Z 2 8 V 4"])
+    solution = layered_bfs(RushHourSearch(card))
+    assert len(solution) == len(breadth_first_search(RushHourSearch(card)))
+
+
+def test_layered_bfs_on_an_unsolvable_card():
+    problem = RushHourSearch(parse_card(["X20H", "A24H"]))
+    assert layered_bfs(problem) == []
@@ -0,0 +1,34 @@
+import os
+import pytest
+from conftest import CARDS_DIR
+from Game import parse_file
+from RushHourSearch import RushHourSearch, MemoizedHeuristic, a_star_search, breadth_first_search, ida_star, \
+    blocking_heuristic
+
+
+@pytest.mark.parametrize("name", ["easy1", "medium1", "hard1"])
+@pytest.mark.parametrize("search", [a_star_search, ida_star])
+def test_memoized_heuristic_is_optimal(name, search):
+    path = os.path.join(CARDS_DIR, name)
+    optimal_length = len(breadth_first_search(RushHourSearch(parse_file(path))))
+    heuristic = MemoizedHeuristic(blocking_heuristic)
+    solution = search(RushHourSearch(parse_file(path)), heuristic)
+    assert len(solution) == optimal_length
+    assert heuristic.misses > 0
+    if search is ida_star:
+        # every iteration re-expands the states of the previous one
+        assert heuristic.hits > 0
+
+
+def test_memoized_heuristic_evicts_the_least_recently_used_state():
+    problem = RushHourSearch(parse_file(os.path.join(CARDS_DIR, "easy1")))
+    start_state = problem.get_start_state()
+    first, second = [state for state, _ in start_state.get_successors()][:2]
+    heuristic = MemoizedHeuristic(blocking_heuristic, capacity=2)
+    for state in (start_state, first, start_state, second):
+        assert heuristic(state, problem) == blocking_heuristic(state, problem)
+    assert (heuristic.hits, heuristic.misses) == (1, 3)
+    assert list(heuristic.memo) == [start_state.key, second.key]
+    # a state of another card clears the memo
+    heuristic(RushHourSearch(parse_file(os.path.join(CARDS_DIR, "easy2"))).get_start_state(), problem)
+    assert len(heuristic.memo) == 1
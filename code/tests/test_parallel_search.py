@@ -0,0 +1,23 @@
+import os
+import pytest
+from conftest import CARDS_DIR
+from Game import parse_file
+from ParallelSearch import hda_star
+from RushHourSearch import RushHourSearch, breadth_first_search, blocking_heuristic
+
+
+def crashing_heuristic(state, problem=None):
+    # kills the worker process that evaluates it, as a segfault would
+    os._exit(3)
+
+
+@pytest.mark.parametrize("name", ["easy1", "medium1"])
+def test_hda_star_is_optimal(name):
+    path = os.path.join(CARDS_DIR, name)
+    solution = hda_star(RushHourSearch(parse_file(path)), blocking_heuristic, processes=2)
+    assert len(solution) == len(breadth_first_search(RushHourSearch(parse_file(path))))
+
+
+def test_dead_worker_stops_the_search():
+    with pytest.raises(RuntimeError, match="exit code 3"):
+        hda_star(RushHourSearch(parse_file(os.path.join(CARDS_DIR, "easy1"))), crashing_heuristic, processes=2)
@@ -0,0 +1,24 @@
+import os
+import pytest
+from conftest import CARDS_DIR
+from Game import parse_file
+from PatternDatabase import PatternDatabase, pattern_database_heuristic
+from RushHourSearch import RushHourSearch, a_star_search, breadth_first_search
+from test_search import CARDS, get_optimal_length
+
+
+@pytest.mark.parametrize("name", CARDS)
+def test_a_star_with_pattern_database_is_optimal(name):
+    solution = a_star_search(RushHourSearch(parse_file(os.path.join(CARDS_DIR, name))), pattern_database_heuristic)
+    assert len(solution) == get_optimal_length(name)
+
+
+@pytest.mark.parametrize("name", ["easy1", "medium1", "hard1"])
+def test_pattern_database_is_admissible(name):
+    problem = RushHourSearch(parse_file(os.path.join(CARDS_DIR, name)))
+    solution = breadth_first_search(problem)
+    pattern_database = PatternDatabase(problem.get_start_state())
+    for i, (state, _) in enumerate(solution):
+        assert pattern_database.get_distance(state) <= len(solution) - i
+    goal_state = solution[-1][0].do_move(solution[-1][1])
+    assert pattern_database.get_distance(goal_state) == 0
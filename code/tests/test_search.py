@@ -0,0 +1,105 @@
+import os
+from functools import lru_cache
+import pytest
+from conftest import CARDS_DIR
+from AnytimeSearch import anytime_a_star
+from BatchHeuristics import BATCH_HEURISTICS, evaluate_batch
+from CardCorpus import parse_card
+from Game import HEURISTICS, INVALID_CARDS, parse_file
+from RushHourSearch import RushHourSearch, a_star_search, bidirectional_search, breadth_first_search, ida_star, \
+    blocked_blocking_heuristic, blocking_heuristic, null_heuristic
+from SearchStats import SearchStats
+
+CARDS = sorted(name for name in os.listdir(CARDS_DIR) if not name.endswith(".zip") and name not in INVALID_CARDS)
+
+
+@lru_cache(maxsize=None)
+def get_optimal_length(name):
+    return len(breadth_first_search(RushHourSearch(parse_file(os.path.join(CARDS_DIR, name)))))
+
+
+@pytest.mark.parametrize("name", CARDS)
+@pytest.mark.parametrize("heuristic", [null_heuristic, blocking_heuristic])
+def test_a_star_is_optimal(name, heuristic):
+    solution = a_star_search(RushHourSearch(parse_file(os.path.join(CARDS_DIR, name))), heuristic)
+    assert len(solution) == get_optimal_length(name)
+
+
+@pytest.mark.parametrize("name", CARDS)
+def test_bidirectional_search_is_optimal(name):
+    solution = bidirectional_search(RushHourSearch(parse_file(os.path.join(CARDS_DIR, name))))
+    assert len(solution) == get_optimal_length(name)
+
+
+def test_bidirectional_search_with_many_goal_states():
+    # an 8x8 card with 14 vehicles has too many goal states to enumerate
+    card = parse_card(["size 8 8", "X 3 0 H", "A 0 0 H", "B 0 3 V", "C 0 5 H", "D 1 1 V", "E 2 2 H", "F 1 7 V",
+                       "G 3 4 V", "H 4 0 V", "I 5 2 H", "J 6 5 H", "K 4 6 V", "O 7 0 H", "P 2 5 V"])
+    solution = bidirectional_search(RushHourSearch(card))
+    assert len(solution) == len(breadth_first_search(RushHourSearch(card)))
+
+
+def test_bidirectional_search_checks_after_the_goal_enumeration():
+    checks = []
+    problem = RushHourSearch(parse_file(os.path.join(CARDS_DIR, "easy1")), SearchStats(checks.append, 10 ** 9))
+    bidirectional_search(problem)
+    assert checks == [problem.stats]
+
+
+@pytest.mark.parametrize("heuristic", [blocking_heuristic, blocked_blocking_heuristic])
+def test_batch_a_star_on_a_large_board(heuristic):
+    # the occupancy masks of a 9x9 board don't fit in 64 bits
+    card = parse_card(["size 9 9", "X 4 0 H", "A 3 3 V", "B 4 5 V", "O 0 5 V", "C 6 4 H", "Z 2 8 V 4"])
+    solution = a_star_search(RushHourSearch(card), heuristic, batch=True)
+    assert len(solution) == len(breadth_first_search(RushHourSearch(card))) > 0
+
+
+# the keys of the 8x8 card with 22 vehicles don't fit in 64 bits
+@pytest.mark.parametrize("lines", [None, ["size 8 8", "X 3 0 H", "A 2 5 H", "B 1 0 V", "C 4 3 V", "D 2 3 V", "E 6 0 H",
+                                          "F 0 4 V", "G 6 6 V", "H 7 3 H", "I 6 5 V", "J 3 5 V", "K 4 1 V", "L 0 0 H 2",
+                                          "M 5 4 V 2", "N 1 1 H 2", "O 4 2 V 2", "P 5 5 H 2", "Q 4 6 H 2", "R 6 2 H 2",
+                                          "S 1 5 H 2", "T 7 1 H 2", "U 0 6 H 2"]])
+def test_batch_heuristics_match_the_heuristics(lines):
+    card = parse_file(os.path.join(CARDS_DIR, "hard1")) if lines is None else parse_card(lines)
+    problem = RushHourSearch(card)
+    states = [problem.get_start_state()]
+    for _ in range(3):
+        states += [successor for state in states for successor, _ in state.get_successors()]
+    for heuristic in BATCH_HEURISTICS:
+        assert evaluate_batch(heuristic, states, problem) == \
+            pytest.approx([heuristic(state, problem) for state in states])
+
+
+@pytest.mark.parametrize("name", CARDS)
+def test_anytime_a_star_bound(name):
+    problem = RushHourSearch(parse_file(os.path.join(CARDS_DIR, name)))
+    solution = anytime_a_star(problem, blocking_heuristic, time_budget=None)
+    optimal_length = get_optimal_length(name)
+    assert problem.suboptimality_bound is not None
+    assert len(solution) <= optimal_length * problem.suboptimality_bound
+    if problem.suboptimality_bound == 1:
+        assert len(solution) == optimal_length
+
+
+@pytest.mark.parametrize("name", ["medium1", "hard1"])
+def test_anytime_a_star_answers_when_the_budget_runs_out_first(name):
+    problem = RushHourSearch(parse_file(os.path.join(CARDS_DIR, name)))
+    solution = anytime_a_star(problem, blocking_heuristic, time_budget=None, max_expanded=1)
+    assert get_optimal_length(name) <= len(solution) <= get_optimal_length(name) * problem.suboptimality_bound
+    state = problem.get_start_state()
+    for previous_state, move in solution:
+        assert previous_state == state
+        state = state.do_move(move)
+    assert state.is_goal()
+
+
+@pytest.mark.parametrize("heuristic", HEURISTICS.values(), ids=lambda heuristic: heuristic.__name__)
+def test_ida_star_solves_with_every_heuristic(heuristic):
+    problem = RushHourSearch(parse_file(os.path.join(CARDS_DIR, "easy2")))
+    solution = ida_star(problem, heuristic)
+    assert len(solution) >= get_optimal_length("easy2")
+    state = problem.get_start_state()
+    for previous_state, move in solution:
+        assert previous_state == state
+        state = state.do_move(move)
+    assert state.is_goal()
@@ -0,0 +1,63 @@
+import os
+import pytest
+from conftest import CARDS_DIR
+from Game import parse_file
+from RushHourSearch import RushHourSearch, a_star_search, blocking_heuristic
+from SolutionCache import SolutionCache, get_version
+
+VERSION = get_version(a_star_search, blocking_heuristic)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = SolutionCache(str(tmp_path / "solutions.sqlite"))
+    yield cache
+    cache.close()
+
+
+def solve(name):
+    problem = RushHourSearch(parse_file(os.path.join(CARDS_DIR, name)))
+    return problem.get_start_state(), a_star_search(problem, blocking_heuristic)
+
+
+def get_path(solution):
+    return [(state.key, move.vehicle_id, move.wanted_move) for state, move in solution]
+
+
+def test_lookup_returns_the_stored_solution(cache):
+    start_state, solution = solve("easy1")
+    assert cache.lookup(start_state, VERSION) is None
+    cache.store(solution, VERSION)
+    assert len(cache) == len(solution) + 1
+    assert get_path(cache.lookup(start_state, VERSION)) == get_path(solution)
+    assert cache.lookup(start_state, get_version(a_star_search, None)) is None
+
+
+def test_lookup_reuses_the_suffix_of_a_stored_solution(cache):
+    _, solution = solve("medium1")
+    cache.store(solution, VERSION)
+    middle = len(solution) // 2
+    assert get_path(cache.lookup(solution[middle][0], VERSION)) == get_path(solution[middle:])
+
+
+def test_entries_survive_reopening(tmp_path):
+    path = str(tmp_path / "solutions.sqlite")
+    start_state, solution = solve("easy2")
+    cache = SolutionCache(path)
+    cache.store(solution, VERSION)
+    cache.close()
+    cache = SolutionCache(path)
+    assert len(cache.lookup(start_state, VERSION)) == len(solution)
+    cache.close()
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    _, first_solution = solve("easy1")
+    _, second_solution = solve("easy2")
+    cache = SolutionCache(str(tmp_path / "solutions.sqlite"), max_entries=len(second_solution) + 1)
+    cache.store(first_solution, VERSION)
+    cache.store(second_solution, VERSION)
+    assert len(cache) == len(second_solution) + 1
+    assert cache.lookup(first_solution[0][0], VERSION) is None
+    assert get_path(cache.lookup(second_solution[0][0], VERSION)) == get_path(second_solution)
+    cache.close()
@@ -0,0 +1,34 @@
+import pytest
+from CardCorpus import parse_card
+from RushHourSearch import RushHourSearch, a_star_search, ida_star, blocking_heuristic
+from Solvability import validate_card
+
+
+@pytest.mark.parametrize("lines", [["X21H", "A12V"], ["X21H", "A05H"], ["X21V"], ["X21H", "A13V", "A00H"]])
+def test_malformed_cards_are_rejected(lines):
+    with pytest.raises(ValueError):
+        validate_card(parse_card(lines))
+    with pytest.raises(ValueError):
+        RushHourSearch(parse_card(lines))
+
+
+@pytest.mark.parametrize("lines", [
+    # a horizontal vehicle in front of X
+    ["X20H", "A24H"],
+    # a full column across the exit row
+    ["X20H", "O03V", "P33V"],
+    # a vertical vehicle held across the exit row by two full rows
+    ["X20H", "A13V", "O00H", "P03H", "Q30H", "R33H"],
+])
+def test_unsolvable_cards_are_not_searched(lines):
+    for search in (a_star_search, ida_star):
+        problem = RushHourSearch(parse_card(lines))
+        assert problem.is_unsolvable()
+        assert search(problem, blocking_heuristic) == []
+        assert problem.expanded == 0
+
+
+def test_solvable_card():
+    problem = RushHourSearch(parse_card(["X20H", "A13V", "O00H", "Q30H"]))
+    assert not problem.is_unsolvable()
+    assert len(a_star_search(problem, blocking_heuristic)) == 1
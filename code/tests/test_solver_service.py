@@ -0,0 +1,75 @@
+import json
+import os
+import signal
+import threading
+import time
+import urllib.error
+import urllib.request
+import pytest
+from conftest import CARDS_DIR
+from Game import parse_file
+from RushHourSearch import RushHourSearch, breadth_first_search
+from SolverService import SolverRequestHandler, SolverService, ThreadingHTTPServer
+
+
+@pytest.fixture
+def server():
+    service = SolverService(processes=1)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SolverRequestHandler)
+    server.service = service
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    service.shutdown()
+
+
+def request(server, method, path, body=None):
+    """
+    :return: a tuple of the status code and the json body of a response
+    """
+    data = json.dumps(body).encode() if body is not None else None
+    url = "http://127.0.0.1:%d%s" % (server.server_address[1], path)
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data, method=method)) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def read_card(name):
+    with open(os.path.join(CARDS_DIR, name)) as file:
+        return file.read()
+
+
+def test_solve(server):
+    status, result = request(server, "POST", "/solve", {"card": read_card("easy1"), "heuristic": "blocked_blocking"})
+    assert status == 200
+    assert result["status"] == "solved"
+    assert result["length"] == len(breadth_first_search(RushHourSearch(parse_file(os.path.join(CARDS_DIR, "easy1")))))
+    assert request(server, "GET", "/solve/%d" % result["id"]) == (200, result)
+
+
+def test_invalid_card(server):
+    status, result = request(server, "POST", "/solve", {"card": "X21H\nA12V\n"})
+    assert status == 400
+    assert "overlaps" in result["error"]
+
+
+def test_dead_worker_restarts_the_pool(server):
+    service = server.service
+    pid = service.pool.submit(os.getpid).result()
+    status, queued = request(server, "POST", "/solve", {"card": read_card("hard3"), "heuristic": "null",
+                                                        "algorithm": "ida", "wait": False})
+    assert status == 202
+    time.sleep(0.5)
+    os.kill(pid, signal.SIGKILL)
+    status, result = request(server, "GET", "/solve/%d" % queued["id"])
+    while status == 200 and result["status"] == "queued":
+        time.sleep(0.1)
+        status, result = request(server, "GET", "/solve/%d" % queued["id"])
+    assert status == 503
+    status, result = request(server, "POST", "/solve", {"card": read_card("easy1")})
+    assert status == 200
+    assert result["status"] == "solved"
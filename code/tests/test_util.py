@@ -0,0 +1,37 @@
+import util
+
+
+def test_bucket_priority_queue_order():
+    queue = util.BucketPriorityQueue()
+    for item, priority, depth in [("a", 3, 0), ("b", 1, 0), ("c", 1, 2), ("d", 2, 5)]:
+        queue.push(item, priority, depth)
+    assert [queue.pop() for _ in range(4)] == ["c", "b", "d", "a"]
+    assert queue.is_empty()
+
+
+def test_bucket_priority_queue_update():
+    queue = util.BucketPriorityQueue(decrease_key=True)
+    queue.push("a", 5)
+    queue.push("b", 3)
+    queue.update("a", 2)
+    # a higher priority doesn't replace the current one
+    queue.update("b", 4)
+    assert queue.pop() == "a"
+    assert queue.pop() == "b"
+    assert queue.is_empty()
+
+
+def test_priority_queue_update():
+    queue = util.PriorityQueue()
+    queue.push("a", 5)
+    queue.push("b", 3)
+    queue.update("a", 2)
+    assert [queue.pop() for _ in range(3)] == ["a", "b", "a"]
+
+
+def test_node_store_costs_over_16_bits():
+    nodes = util.NodeStore()
+    root = nodes.add(1, 1, -1, 0, 0, 0.0)
+    node = nodes.add(2, 2, root, 0, 70000, 1.5)
+    assert nodes.costs[node] == 70000
+    assert nodes.get_index(2) == node
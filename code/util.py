@@ -1,5 +1,7 @@
 
 import heapq
+from array import array
+from collections import deque
 
 """
  Data structures
@@ -29,11 +31,11 @@ class Queue:
     """A container with a first-in-first-out (FIFO) policy."""
 
     def __init__(self):
-        self.list = []
+        self.list = deque()
 
     def push(self, item):
         """Enqueue the 'item' into the queue"""
-        self.list.insert(0, item)
+        self.list.appendleft(item)
 
     def pop(self):
         """Remove the earliest pushed item in the queue and return it"""
@@ -54,25 +56,154 @@ class PriorityQueue:
       Note that this PriorityQueue does not allow you to change the priority
       of an item.  However, you may insert the same item multiple times with
       different priorities.
+
+      Items with the same priority are popped deepest first (see push), and
+      then in insertion order; the items themselves are never compared.
     """
 
     def __init__(self):
         self.heap = []
-        self.init = False
-
-    def push(self, item, priority):
-        if not self.init:
-            self.init = True
-            try:
-                item < item
-            except:
-                item.__class__.__lt__ = lambda x, y: True
-        pair = (priority, item)
-        heapq.heappush(self.heap, pair)
+        self.count = 0
+
+    def push(self, item, priority, depth=0):
+        entry = (priority, -depth, self.count, item)
+        self.count += 1
+        heapq.heappush(self.heap, entry)
+
+    def update(self, item, priority, depth=0):
+        """
+        Push the item again with a lower priority. The entry with the old priority
+        stays in the heap, the caller must skip it when it is popped (e.g. A*
+        skips the closed nodes).
+        """
+        self.push(item, priority, depth)
 
     def pop(self):
-        (priority, item) = heapq.heappop(self.heap)
+        (priority, depth, count, item) = heapq.heappop(self.heap)
         return item
 
     def is_empty(self):
         return len(self.heap) == 0
+
+
+class BucketPriorityQueue:
+    """
+      A priority queue for small integer priorities, with the same interface as
+      PriorityQueue. Items are kept in buckets by priority and, inside a bucket,
+      by depth: pop returns an item of the lowest priority, and among those one of
+      the deepest (last in first out). The non-empty priorities and depths are
+      tracked in small heaps that only change when a bucket is created or
+      emptied, so push and pop are O(1) in practice.
+
+      With decrease_key=True the queue remembers the current priority of every
+      item, update lowers it, and the stale entries are skipped when popped.
+    """
+
+    def __init__(self, decrease_key=False):
+        self.buckets = {}
+        self.priorities = []
+        self.depths = {}
+        self.size = 0
+        self.entries = {} if decrease_key else None
+
+    def push(self, item, priority, depth=0):
+        bucket = self.buckets.get(priority)
+        if bucket is None:
+            bucket = self.buckets[priority] = {}
+            self.depths[priority] = []
+            heapq.heappush(self.priorities, priority)
+        items = bucket.get(depth)
+        if items is None:
+            items = bucket[depth] = []
+            heapq.heappush(self.depths[priority], -depth)
+        items.append(item)
+        self.size += 1
+        if self.entries is not None:
+            self.entries[item] = (priority, depth)
+
+    def update(self, item, priority, depth=0):
+        """Push the item, or lower its priority if it is already in the queue with a higher one"""
+        entry = self.entries.get(item)
+        if entry is None or (priority, -depth) < (entry[0], -entry[1]):
+            self.push(item, priority, depth)
+
+    def pop(self):
+        while True:
+            priority = self.priorities[0]
+            depths = self.depths[priority]
+            depth = -depths[0]
+            bucket = self.buckets[priority]
+            items = bucket[depth]
+            item = items.pop()
+            self.size -= 1
+            if not items:
+                del bucket[depth]
+                heapq.heappop(depths)
+                if not depths:
+                    del self.buckets[priority]
+                    del self.depths[priority]
+                    heapq.heappop(self.priorities)
+            if self.entries is None:
+                return item
+            if self.entries.get(item) == (priority, depth):
+                del self.entries[item]
+                return item
+
+    def is_empty(self):
+        if self.entries is not None:
+            return len(self.entries) == 0
+        return self.size == 0
+
+
+class NodeStore:
+    """
+      Array backed storage of search nodes. Every node gets an integer index, and
+      stores its state key and occupancy mask, the index of its parent node (-1 for
+      the root), a one byte move code (see Bitboard.get_move_code), its cost, its
+      heuristic value and whether it was expanded (closed). A node takes a few tens
+      of bytes, most of them in the dictionary from state keys to node indices.
+      Keys and occupancies that may not fit in 64 bits (see Bitboard.wide_keys) are
+      kept in lists instead.
+    """
+
+    def __init__(self, wide_keys=False, wide_occupancy=False):
+        self.keys = [] if wide_keys else array('Q')
+        self.occupancies = [] if wide_occupancy else array('Q')
+        self.parents = array('l')
+        self.moves = array('B')
+        self.costs = array('I')
+        self.heuristics = array('d')
+        self.closed = bytearray()
+        self.index = {}
+
+    def add(self, key, occupancy, parent, move_code, cost, h):
+        """Add a node and return its index"""
+        node = len(self.keys)
+        self.keys.append(key)
+        self.occupancies.append(occupancy)
+        self.parents.append(parent)
+        self.moves.append(move_code)
+        self.costs.append(cost)
+        self.heuristics.append(h)
+        self.closed.append(0)
+        self.index[key] = node
+        return node
+
+    def get_index(self, key):
+        """Returns the index of the node of a state key, or None"""
+        return self.index.get(key)
+
+    def get_path(self, node):
+        """Returns the indices of the nodes from the root to the given node"""
+        path = []
+        while node != -1:
+            path.append(node)
+            node = self.parents[node]
+        path.reverse()
+        return path
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def __len__(self):
+        return len(self.keys)